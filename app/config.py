@@ -44,6 +44,109 @@ ROIS = [
 # [얼굴 인식 영역 보정] (상대 좌표)
 FACE_OFFSET = {"x": -0.05078, "y": -0.02083, "w": 0.05569, "h": 0.16278}
 
+# [스캔 주기]
+SCAN_FRAME_BUDGET = 0.1         # 실행 중 목표 스캔 주기 (초), 작업 시간을 뺀 만큼만 대기
+SCAN_BACKOFF_MIN = 0.2          # 게임 없음/최소화/비활성 시 첫 대기 시간 (초)
+SCAN_BACKOFF_MAX = 2.0          # 지수 백오프 최대 대기 시간 (초)
+
+# [게임 창 추적]
+WINDOW_HEARTBEAT = 1.0          # 이동/크기 변경 알림이 없어도 창 정보를 재조회하는 주기 (초)
+
+# [병렬 인식]
+SCAN_WORKERS = 3                # ROI 병렬 인식 스레드 수 (0 또는 1이면 순차 처리)
+OPENCV_THREADS = 0              # OpenCV 내부 스레드 수 (0이면 CPU 코어 수 / SCAN_WORKERS로 자동 설정)
+
+# [인식 기준값]
+FACE_MATCH_THRESHOLD = 0.15     # 얼굴: TM_SQDIFF_NORMED 차이값 이하일 때 인식
+SKILL_MATCH_THRESHOLD = 0.75    # 스킬: TM_CCOEFF_NORMED 점수 이상일 때 인식
+
+# [추적 모드]
+# 직전 인식 결과를 직전 위치 주변에서 먼저 재확인하고, 실패할 때만 전체 탐색합니다.
+TRACKING_MODE = True
+TRACK_WINDOW_RATIO = 0.1        # 재확인 탐색 창 여유 (템플릿 크기 대비)
+TRACK_FACE_DIFF_MARGIN = 0.03   # 확정 당시 얼굴 차이값 대비 허용 증가폭
+TRACK_SKILL_SCORE_MARGIN = 0.05 # 확정 당시 스킬 점수 대비 허용 감소폭
+TRACK_SKILL_RIVAL_MARGIN = 0.01 # 재확인 시 직전 스킬 점수가 같은 캐릭터의 다른 잠재력 점수보다 높아야 하는 최소 차이
+
+# [Coarse-to-fine 탐색]
+# 축소(pyrDown) 프레임에서 후보를 고른 뒤 상위 후보만 원본 해상도의 작은 창에서 재확인합니다.
+PYRAMID_SEARCH = True
+PYRAMID_LEVELS = 1              # pyrDown 횟수
+PYRAMID_TOP_K = 3               # 원본 해상도에서 재확인할 후보 수
+
+# [스킬 아이콘 앵커]
+# 카드 안 아이콘 위치를 ROI/해상도별로 학습해 두고, 이후에는 그 주변만 탐색합니다.
+ANCHOR_MODE = True
+ANCHOR_FILE = os.path.join(RESOURCES_DIR, "anchors.json")
+ANCHOR_MARGIN_RATIO = 0.05      # 앵커 탐색 창 여유 (템플릿 크기 대비)
+ANCHOR_RECORD_SCORE = 0.9       # 이 점수 이상인 전체 탐색 결과만 앵커로 학습
+ANCHOR_MOVE_TOLERANCE = 2       # 이 픽셀 이하 차이는 같은 앵커로 간주 (파일 재저장 안 함)
+
+# [템플릿 샤드 캐시]
+# 기본은 폴더 mtime만 확인합니다. 폴더 mtime이 바뀌지 않는 제자리 덮어쓰기(같은 이름 PNG 교체)까지
+# 잡으려면 True로 두어 시작 시 파일별 size/mtime을 확인합니다. (배치는 --full-check로도 지정 가능)
+TEMPLATE_FULL_CHECK = False
+
+# [템플릿 스케일 캐시]
+# 게임 창 크기별로 미리 스케일해 둘 템플릿 세트 개수 (LRU)
+SCALED_TEMPLATE_CACHE_SIZE = 2
+
+# [얼굴 사전 필터]
+# 축소 시그니처 행렬로 얼굴 후보를 먼저 추린 뒤, 상위 후보만 masked matchTemplate으로 정밀 판정합니다.
+FACE_INDEX = True
+FACE_INDEX_SIZE = 16            # 시그니처 한 변 크기 (픽셀)
+FACE_INDEX_TOP_K = 3            # 정밀 판정할 후보 수
+
+# [빌드 우선 탐색]
+# 빌드에 포함된 캐릭터/잠재력부터 탐색하고, 확실하게 일치하면 나머지 후보는 건너뜁니다.
+BUILD_FIRST_SEARCH = True
+BUILD_FACE_CONFIDENT_DIFF = 0.05    # 빌드 캐릭터 얼굴 차이값이 이 값 이하이면 나머지 캐릭터 생략 (서로 다른 얼굴 간 차이값보다 낮게)
+BUILD_SKILL_CONFIDENT_SCORE = 0.98  # 빌드 잠재력 점수가 이 값 이상이면 나머지 잠재력 생략 (비슷한 아이콘 간 점수보다 높게)
+
+# [스킬 템플릿 지연 로딩]
+# 캐릭터 스킬 템플릿은 얼굴이 처음 인식되거나 빌드에 포함될 때 백그라운드에서 로드합니다.
+SKILL_TEMPLATE_MEMORY_MB = 32   # 상주 스킬 템플릿(원본 + 해상도별 스케일본) 메모리 상한 (LRU)
+                                # 배치 매칭용 스펙트럼은 포함하지 않음 (SKILL_BANK_MEMORY_MB로 따로 제한)
+
+# [스킬 매칭 엔진]
+# 배치 매칭용 템플릿 스펙트럼(프레임 크기로 패딩된 complex64)의 메모리 상한 (LRU, 원본/축소 매처 각각)
+# 빌드 우선 탐색 시 캐릭터당 빌드/나머지 2세트, 1080p 카드 전체 기준 캐릭터 하나에 약 12 MB
+SKILL_BANK_MEMORY_MB = 64
+
+# [화면 변화 감지]
+# ROI 픽셀이 바뀌지 않았다면 이전 인식 결과를 재사용합니다.
+CHANGE_SAMPLE_STEP = 4          # 다운샘플 간격 (픽셀)
+CHANGE_BLOCK_SIZE = 4           # 차이를 평균낼 블록 크기 (다운샘플 픽셀 기준, 화면에서는 16px)
+CHANGE_THRESHOLD = 8.0          # 블록 평균 절대 차이 최댓값 임계값 (0~255)
+SETTLE_FRAMES = 2               # 변화 후 안정화 대기 프레임 수
+CHANGE_MAX_WAIT_FRAMES = 10     # 계속 변하는 화면이라도 이 프레임마다 강제 인식
+
+# [세션 녹화]
+# 캡처 프레임을 녹화해 두면 게임 없이 같은 세션을 재생(python -m src.replay)해 성능/정확도를 비교할 수 있습니다.
+SESSION_RECORD = False
+SESSIONS_DIR = os.path.join(BASE_DIR, "sessions")
+
+# [성능 계측]
+# 단계별 소요 시간(캡처, 스케일, 흑백 변환, 얼굴/스킬 매칭, 시그널 전송, 틱 전체)을 항상 기록합니다.
+PROFILE_WINDOW = 300            # 백분위 계산에 쓰는 단계별 최근 측정값 수
+PROFILE_EMIT_INTERVAL = 1.0     # 컨트롤 패널/디버그 오버레이로 통계를 보내는 주기 (초)
+PROFILE_DIR = os.path.join(BASE_DIR, "profiles")
+
+# [오버레이]
+# 오버레이 창은 게임 클라이언트 영역 + 여백 크기로 게임 창을 따라다닙니다. (데스크톱 전체를 덮지 않음)
+OVERLAY_MARGIN = 48             # 클라이언트 영역 바깥 여백 (물리 픽셀, 라벨이 창 밖으로 나가는 경우 대비)
+
+# [게임 데이터 캐시]
+# 빌드 변환기가 쓰는 SSToy DB(Character/Potential/EN Character)를 디스크에 보관하고,
+# TTL이 지나면 ETag/Last-Modified 조건부 요청으로만 갱신합니다. (네트워크 오류 시 캐시 사용)
+GAME_DATA_CACHE_DIR = os.path.join(RESOURCES_DIR, "gamedata")
+GAME_DATA_TTL = 6 * 60 * 60     # 캐시를 재확인 없이 쓰는 시간 (초)
+GAME_DATA_TIMEOUT = (5, 30)     # 요청 타임아웃 (연결, 읽기) 초
+GAME_DATA_OFFLINE = False       # True면 네트워크 없이 캐시만 사용
+GAME_DATA_RETRIES = 3           # 연결 실패/5xx 재시도 횟수
+GAME_DATA_BACKOFF = 0.5         # 재시도 대기 (0.5, 1, 2초... 지수 증가)
+GAME_DATA_CHUNK_SIZE = 64 * 1024  # 진행률 보고 단위 (바이트)
+
 # [GUI 상태 정의]
 class AppStatus(Enum):
     LOADING = auto()    # 로딩 중
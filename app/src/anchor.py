@@ -0,0 +1,61 @@
+import json
+import os
+import threading
+
+from config import ANCHOR_FILE, ANCHOR_MOVE_TOLERANCE
+from src.file_utils import atomic_write
+
+class AnchorStore:
+    """
+    ROI별, 해상도별로 스킬 아이콘이 매칭된 위치(카드 영역 기준 좌상단 좌표)를 학습하고 파일로 저장합니다.
+    잠재력 아이콘은 카드 안에서 항상 같은 자리에 있으므로,
+    이후 스캔은 카드 전체 대신 앵커 주변 작은 창만 탐색할 수 있습니다.
+    path=None이면 파일 없이 메모리에서만 학습합니다. (리플레이 등)
+    """
+    def __init__(self, path=ANCHOR_FILE):
+        self.path = path
+        self.anchors = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    @staticmethod
+    def _key(geo):
+        return f"{geo['w']}x{geo['h']}"
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.anchors = json.load(f)
+        except Exception as e:
+            print(f"[앵커] 파일 로드 실패 (무시하고 새로 학습): {e}")
+            self.anchors = {}
+
+    def save(self):
+        """임시 파일에 쓴 뒤 교체 (저장 도중 종료되어도 기존 파일 유지)"""
+        if not self.path:
+            return
+        try:
+            atomic_write(self.path, json.dumps(self.anchors, indent=2), 'w')
+        except Exception as e:
+            print(f"[앵커] 파일 저장 실패: {e}")
+
+    def get(self, geo, index):
+        """학습된 앵커 (x, y) 또는 None"""
+        with self._lock:
+            loc = self.anchors.get(self._key(geo), {}).get(str(index))
+        return tuple(loc) if loc else None
+
+    def record(self, geo, index, loc):
+        """
+        전체 카드 탐색에서 확실하게 매칭된 위치를 기록합니다.
+        기존 앵커와 거의 같은 위치면 파일을 다시 쓰지 않습니다.
+        """
+        with self._lock:
+            per_geo = self.anchors.setdefault(self._key(geo), {})
+            old = per_geo.get(str(index))
+            if old and abs(old[0] - loc[0]) <= ANCHOR_MOVE_TOLERANCE and abs(old[1] - loc[1]) <= ANCHOR_MOVE_TOLERANCE:
+                return
+            per_geo[str(index)] = [int(loc[0]), int(loc[1])]
+            self.save()
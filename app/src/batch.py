@@ -0,0 +1,167 @@
+import argparse
+import contextlib
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from config import TEMPLATE_FOLDER, BUILDS_FOLDER, DEFAULT_BUILD_FILE, PYRAMID_SEARCH, FACE_INDEX, TEMPLATE_FULL_CHECK
+
+# =========================================================
+# 스크린샷 배치 인식
+# 저장된 게임 스크린샷(게임 클라이언트 영역 전체)을 여러 프로세스로 나눠 인식하고
+# 이미지마다 JSONL 한 줄을 씁니다. 템플릿 업데이트 후 회귀 확인용.
+#   python -m src.batch screenshots/ "archive/**/*.png" --output result.jsonl
+# =========================================================
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+# 프로세스마다 한 번만 만드는 인식 상태 (_init_process에서 생성)
+_context = None
+
+def collect_images(patterns):
+    """폴더/글롭 패턴/파일 경로 목록 -> 정렬된 이미지 경로 목록 (중복 제거)"""
+    paths = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, _, files in os.walk(pattern):
+                paths.update(os.path.join(root, f) for f in files if f.lower().endswith(IMAGE_EXTENSIONS))
+        elif os.path.isfile(pattern):
+            paths.add(pattern)
+        else:
+            paths.update(p for p in glob.glob(pattern, recursive=True) if p.lower().endswith(IMAGE_EXTENSIONS))
+    return sorted(paths)
+
+def read_image(path):
+    """이미지를 BGRA로 읽기 (한글 경로 대응을 위해 imdecode 사용)"""
+    img = cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+    if img is None:
+        return None
+    if img.ndim == 2:
+        return cv2.cvtColor(img, cv2.COLOR_GRAY2BGRA)
+    if img.shape[2] == 3:
+        return cv2.cvtColor(img, cv2.COLOR_BGR2BGRA)
+    return img
+
+def _init_process(build_file):
+    """워커 프로세스 초기화: 템플릿/빌드/얼굴 사전 필터를 프로세스당 한 번만 로드"""
+    global _context
+    from src.load_image import load_templates, ScaledTemplateCache
+    from src.load_build import BuildLoader
+    from src.matcher import FaceIndex
+    from src.recognizer import RoiRecognizer
+
+    # 프로세스 수만큼 병렬로 돌므로 OpenCV 내부 스레드는 하나로 제한 (과다 구독 방지)
+    cv2.setNumThreads(1)
+    with contextlib.redirect_stdout(sys.stderr):
+        face_templates, skill_templates = load_templates(TEMPLATE_FOLDER)
+        # 이미지끼리 서로 독립적이므로 직전 결과 추적/앵커 학습은 끔
+        recognizer = RoiRecognizer(tracking=False)
+        recognizer.set_build(BuildLoader(build_file))
+        if FACE_INDEX:
+            recognizer.face_index = FaceIndex(face_templates)
+    _context = {
+        "recognizer": recognizer,
+        "cache": ScaledTemplateCache(face_templates, skill_templates),
+    }
+
+def recognize_file(path):
+    """스크린샷 한 장 인식. 반환값: JSONL 한 줄에 해당하는 dict"""
+    start = time.perf_counter()
+    frame = read_image(path)
+    if frame is None:
+        return {"file": path, "error": "이미지를 읽을 수 없습니다"}
+
+    h, w = frame.shape[:2]
+    geo = {"x": 0, "y": 0, "w": w, "h": h, "focused": True}
+    recognizer = _context["recognizer"]
+    cache = _context["cache"]
+
+    face_templates, skill_templates = cache.get(geo)
+    coarse_templates = None
+    if PYRAMID_SEARCH:
+        coarse_faces, coarse_skills = cache.get_coarse(geo)
+        coarse_templates = (coarse_faces if recognizer.face_index is None else None, coarse_skills)
+
+    recognizer.reset_tracks()
+    rois = []
+    for i, (result, elapsed) in enumerate(recognizer.recognize_frame(frame, geo, face_templates,
+                                                                      skill_templates, coarse_templates)):
+        face_debug = result["face_debug"]
+        match = result["match"]
+        rois.append({
+            "index": i,
+            "character": result["character"],
+            "face_score": round(float(face_debug[1]), 4) if face_debug else None,
+            "potential": match[0] if match else None,
+            "score": round(float(match[1]), 4) if match else None,
+            "matched": match[2] if match else False,
+            "priority": match[3] if match else 0,
+            "ms": round(elapsed * 1000, 3),
+        })
+
+    return {
+        "file": path,
+        "width": w,
+        "height": h,
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 3),
+        "rois": rois,
+    }
+
+def run_batch(paths, build_file, output, workers=None, chunksize=4, full_check=TEMPLATE_FULL_CHECK):
+    """
+    이미지 목록을 프로세스 풀로 인식해 output(파일 객체)에 입력 순서대로 JSONL로 씁니다.
+    full_check: 샤드 캐시 갱신 시 폴더 mtime과 무관하게 파일별로 확인 (템플릿을 제자리에서 덮어쓴 경우)
+    반환값: (처리한 이미지 수, 실패 수)
+    """
+    # 샤드 캐시 갱신은 부모 프로세스에서 한 번만 (워커끼리 동시에 다시 만들지 않도록)
+    from src.load_image import load_templates
+    with contextlib.redirect_stdout(sys.stderr):
+        load_templates(TEMPLATE_FOLDER, full_check)
+
+    workers = workers or os.cpu_count() or 1
+    done = failed = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_process, initargs=(build_file,)) as executor:
+        for record in executor.map(recognize_file, paths, chunksize=chunksize):
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            done += 1
+            if "error" in record:
+                failed += 1
+    return done, failed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="스크린샷 배치 인식 (템플릿 회귀 확인용)")
+    parser.add_argument("inputs", nargs="+", help="스크린샷 폴더, 글롭 패턴 또는 파일 경로")
+    parser.add_argument("--build", default=os.path.join(BUILDS_FOLDER, DEFAULT_BUILD_FILE), help="빌드 JSON 경로")
+    parser.add_argument("--output", help="결과 JSONL 저장 경로 (생략 시 표준 출력)")
+    parser.add_argument("--workers", type=int, default=None, help="프로세스 수 (기본: CPU 코어 수)")
+    parser.add_argument("--chunksize", type=int, default=4, help="프로세스에 한 번에 넘길 이미지 수")
+    parser.add_argument("--full-check", action="store_true", default=TEMPLATE_FULL_CHECK,
+                        help="템플릿 샤드 캐시를 파일 단위로 확인 (PNG를 같은 이름으로 덮어쓴 경우)")
+    args = parser.parse_args(argv)
+
+    paths = collect_images(args.inputs)
+    if not paths:
+        print("[배치] 인식할 이미지가 없습니다.", file=sys.stderr)
+        return 1
+
+    start = time.perf_counter()
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            done, failed = run_batch(paths, args.build, f, args.workers, args.chunksize, args.full_check)
+    else:
+        done, failed = run_batch(paths, args.build, sys.stdout, args.workers, args.chunksize,
+                                   args.full_check)
+    elapsed = time.perf_counter() - start
+    print(f"[배치] {done}장 처리 (실패 {failed}), {elapsed:.1f}초 "
+          f"({done / elapsed:.1f}장/초)" + (f" -> {args.output}" if args.output else ""), file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
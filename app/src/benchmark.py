@@ -0,0 +1,458 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from config import (TEMPLATE_FOLDER, BUILDS_FOLDER, DEFAULT_BUILD_FILE, REFERENCE_WIDTH, REFERENCE_HEIGHT,
+                    ROIS, PYRAMID_LEVELS, PYRAMID_TOP_K, CHANGE_MAX_WAIT_FRAMES, __version__)
+
+# 벤치마크 해상도 (게임 창 클라이언트 크기)
+RESOLUTIONS = {
+    "720p": (1280, 720),
+    "1080p": (1920, 1080),
+    "1440p": (2560, 1440),
+    "4k": (3840, 2160),
+}
+
+# 평상시(화면 변화 없음) 틱 하나가 mss 캡처 버퍼 외에 새로 할당해도 되는 최대 메모리
+# (파이썬 객체 수준, 프레임 복사/작업 버퍼는 0이어야 함)
+STEADY_TICK_ALLOC_LIMIT = 4096
+
+# coarse-to-fine 일치 검사에서 캐릭터당 확인할 잠재력 수 기본값 (0이면 전체)
+PYRAMID_CHECK_SAMPLES = 4
+# 일치 검사 합성 샘플에 더하는 픽셀 노이즈 폭 (+-)
+PYRAMID_CHECK_NOISE = 8
+
+# 합성 장면에서 카드 안에 아이콘을 붙일 위치 (기준 해상도 좌표)
+SKILL_OFFSET = (15, 40)
+FACE_OFFSET_PX = (2, 3)
+
+def measure(fn, repeat, warmup=1):
+    """fn을 warmup회 실행 후 repeat회 측정. 반환값: (초 단위 측정값 목록, 마지막 반환값)"""
+    result = None
+    for _ in range(warmup):
+        result = fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return times, result
+
+def summarize(stage, engine, resolution, times, **extra):
+    times_ms = np.array(times) * 1000
+    row = {
+        "stage": stage,
+        "engine": engine,
+        "resolution": resolution,
+        "n": len(times),
+        "median_ms": round(float(np.median(times_ms)), 4),
+        "p95_ms": round(float(np.percentile(times_ms, 95)), 4),
+        "min_ms": round(float(times_ms.min()), 4),
+    }
+    row.update(extra)
+    return row
+
+def synthesize_frame(plan, geo, picks, face_raw, skill_raw, seed=0):
+    """
+    CapturePlan 합집합 영역 크기의 BGRA 프레임을 합성합니다.
+    배경은 고정 시드 노이즈, 각 ROI의 얼굴/카드 영역에 실제 템플릿을 게임 해상도로 스케일해 붙입니다.
+    picks: ROI별 (char_name, potential filename)
+    """
+    from src.load_image import scale_template
+
+    rng = np.random.default_rng(seed)
+    h, w = plan.monitor["height"], plan.monitor["width"]
+    gray = cv2.GaussianBlur(rng.integers(0, 255, (h, w), dtype=np.uint8), (9, 9), 4)
+    scale = geo["w"] / REFERENCE_WIDTH
+
+    for i, (char_name, filename) in enumerate(picks):
+        face_slices = plan.face_slices[i]
+        if face_slices is not None:
+            face = scale_template(face_raw[char_name][0], scale)
+            y = face_slices[0].start + FACE_OFFSET_PX[1]
+            x = face_slices[1].start + FACE_OFFSET_PX[0]
+            fh = min(face.shape[0], face_slices[0].stop - y)
+            fw = min(face.shape[1], face_slices[1].stop - x)
+            gray[y:y + fh, x:x + fw] = face[:fh, :fw]
+
+        card_slices = plan.card_slices[i]
+        skill = scale_template(skill_raw[char_name][filename], scale)
+        y = card_slices[0].start + int(SKILL_OFFSET[1] * scale)
+        x = card_slices[1].start + int(SKILL_OFFSET[0] * scale)
+        gray[y:y + skill.shape[0], x:x + skill.shape[1]] = skill
+
+    return cv2.cvtColor(gray, cv2.COLOR_GRAY2BGRA)
+
+class FrameSource:
+    """mss 대신 사용하는 고정 프레임 소스 (합집합 영역 크기의 프레임을 그대로 반환)"""
+    def __init__(self, frame):
+        self.frame = frame
+
+    def grab(self, monitor):
+        return self.frame
+
+class RawShot:
+    """mss ScreenShot처럼 원본 BGRA 바이트(raw)와 크기만 가진 캡처 결과"""
+    def __init__(self, raw, width, height):
+        self.width = width
+        self.height = height
+        self.raw = bytearray(raw)
+
+class RawFrameSource:
+    """
+    mss 대용 (CapturePlan.grab의 복사 없는 경로 측정용).
+    실제 mss처럼 grab마다 새 bytearray에 프레임을 담아 돌려주므로 캡처 버퍼 할당도 측정에 포함됩니다.
+    """
+    def __init__(self, frame):
+        self.height, self.width = frame.shape[:2]
+        self.raw = np.ascontiguousarray(frame).tobytes()
+
+    def grab(self, monitor):
+        return RawShot(self.raw, self.width, self.height)
+
+def cv2_skill_loop(gray, templates):
+    """기준 엔진: 템플릿마다 matchTemplate을 호출하는 기존 방식"""
+    best_filename, best_score = "", 0
+    for filename, skill_img in templates.items():
+        if gray.shape[0] < skill_img.shape[0] or gray.shape[1] < skill_img.shape[1]:
+            continue
+        res = cv2.matchTemplate(gray, skill_img, cv2.TM_CCOEFF_NORMED)
+        _, max_val, _, _ = cv2.minMaxLoc(res)
+        if max_val > best_score:
+            best_filename, best_score = filename, max_val
+    return best_filename, best_score
+
+def bench_load_templates(repeat):
+    """load_templates 콜드(캐시 없음)/캐시 사용 시간 (템플릿 폴더 복사본에서 측정)"""
+    from src.load_image import load_templates
+
+    rows = []
+    work_dir = tempfile.mkdtemp(prefix="sstoy_bench_")
+    try:
+        base = os.path.join(work_dir, "templates")
+        for sub in ("icons", "potentials"):
+            shutil.copytree(os.path.join(TEMPLATE_FOLDER, sub), os.path.join(base, sub))
+
+        cold = []
+        for _ in range(repeat):
+            shutil.rmtree(os.path.join(base, "cache"), ignore_errors=True)
+            start = time.perf_counter()
+            load_templates(base)
+            cold.append(time.perf_counter() - start)
+        rows.append(summarize("load_templates", "cold", None, cold))
+
+        cached, _ = measure(lambda: load_templates(base), repeat)
+        rows.append(summarize("load_templates", "cached", None, cached))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return rows
+
+def bench_resolution(label, size, face_raw, skill_raw, build_loader, recognizer, repeat, seed):
+    """해상도 하나에 대해 캡처/전처리/얼굴/스킬 단계를 각각 측정"""
+    from src.capture import CapturePlan
+    from src.load_image import ScaledTemplateCache
+    from src.matcher import FaceIndex
+
+    geo = {"x": 0, "y": 0, "w": size[0], "h": size[1], "focused": True}
+    rng = np.random.default_rng(seed)
+    chars = sorted(c for c in face_raw if c in skill_raw and skill_raw[c])
+    picks = []
+    for _ in ROIS:
+        char_name = chars[rng.integers(len(chars))]
+        files = sorted(skill_raw[char_name])
+        picks.append((char_name, files[rng.integers(len(files))]))
+
+    plan = CapturePlan(geo)
+    frame = synthesize_frame(plan, geo, picks, face_raw, skill_raw, seed)
+    source = FrameSource(frame)
+
+    cache = ScaledTemplateCache(face_raw, skill_raw)
+    faces, skills = cache.get(geo)
+    coarse_faces, coarse_skills = cache.get_coarse(geo)
+    face_index = FaceIndex(face_raw)
+
+    rows = []
+
+    # 1. 캡처 + ROI 슬라이싱 (CapturePlan 생성 포함 / 재사용)
+    def capture(new_plan):
+        p = CapturePlan(geo) if new_plan else plan
+        f = p.grab(source)
+        return [(p.face_view(f, i), p.card_view(f, i)) for i in range(len(ROIS))]
+    times, views = measure(lambda: capture(False), repeat)
+    rows.append(summarize("capture", "plan_reused", label, times))
+    times, _ = measure(lambda: capture(True), repeat)
+    rows.append(summarize("capture", "plan_rebuilt", label, times))
+
+    # 2. 프레임 리사이즈 (기준 해상도로 축소하던 기존 방식) / 3. 그레이스케일 변환
+    ref_w = int(round(views[0][1].shape[1] * REFERENCE_WIDTH / size[0]))
+    ref_h = int(round(views[0][1].shape[0] * REFERENCE_HEIGHT / size[1]))
+    times, _ = measure(lambda: [cv2.resize(card, (ref_w, ref_h), interpolation=cv2.INTER_AREA) for _, card in views], repeat)
+    rows.append(summarize("resize", "card_to_reference", label, times))
+    times, _ = measure(lambda: [cv2.cvtColor(card, cv2.COLOR_BGRA2GRAY) for _, card in views], repeat)
+    rows.append(summarize("cvtcolor", "card", label, times))
+    times, _ = measure(lambda: [cv2.cvtColor(face, cv2.COLOR_BGRA2GRAY) for face, _ in views if face is not None], repeat)
+    rows.append(summarize("cvtcolor", "face", label, times))
+
+    face_grays = [cv2.cvtColor(face, cv2.COLOR_BGRA2GRAY) if face is not None else None for face, _ in views]
+    card_grays = [cv2.cvtColor(card, cv2.COLOR_BGRA2GRAY) for _, card in views]
+
+    # 4. 얼굴 탐색 (ROI 3개 합계, 엔진별)
+    recognizer.build_candidates = None
+    face_engines = {
+        "exhaustive": (None, None),
+        "coarse_to_fine": (None, coarse_faces),
+        "index": (face_index, None),
+    }
+    for engine, (index, coarse) in face_engines.items():
+        recognizer.face_index = index
+        run = lambda: [recognizer.search_face(g, faces, coarse)[0] if g is not None else None for g in face_grays]
+        times, found = measure(run, repeat)
+        correct = sum(f == p[0] for f, p in zip(found, picks))
+        rows.append(summarize("face", engine, label, times, correct=correct, total=len(picks)))
+    recognizer.face_index = None
+
+    # 5. 스킬 탐색 (ROI 3개 합계, 엔진별) - 템플릿 수 대비 비교용으로 후보 수도 기록
+    skill_engines = {
+        "cv2_loop": lambda g, c: cv2_skill_loop(g, skills[c]),
+        "batch": lambda g, c: recognizer.search_skill_set(g, c, skills[c])[:2],
+        "coarse_to_fine": lambda g, c: recognizer.search_skill_set(g, c, skills[c], coarse_skills[c])[:2],
+    }
+    for engine, search in skill_engines.items():
+        run = lambda: [search(g, p[0]) for g, p in zip(card_grays, picks)]
+        times, found = measure(run, repeat)
+        correct = sum(f[0] == p[1] for f, p in zip(found, picks))
+        templates = sum(len(skills[p[0]]) for p in picks)
+        rows.append(summarize("skill", engine, label, times, correct=correct, total=len(picks), templates=templates))
+
+    # 6. 빌드 우선순위 조회 (인식된 잠재력마다 호출)
+    all_files = [(c, f) for c in chars for f in skill_raw[c]]
+    times, _ = measure(lambda: [build_loader.get_priority(c, f) for c, f in all_files], repeat)
+    rows.append(summarize("get_priority", f"{len(all_files)}_lookups", label, times))
+
+    return rows
+
+def _embed(rng, shape, template):
+    """shape 크기의 블러 노이즈 배경 임의 위치에 노이즈를 더한 템플릿을 붙인 흑백 영상"""
+    bg = cv2.GaussianBlur(rng.integers(0, 255, shape, dtype=np.uint8), (9, 9), 4)
+    y = rng.integers(0, shape[0] - template.shape[0] + 1)
+    x = rng.integers(0, shape[1] - template.shape[1] + 1)
+    noise = rng.integers(-PYRAMID_CHECK_NOISE, PYRAMID_CHECK_NOISE, template.shape)
+    bg[y:y + template.shape[0], x:x + template.shape[1]] = np.clip(template.astype(np.int16) + noise, 0, 255)
+    return bg
+
+def bench_pyramid_equivalence(label, size, face_raw, skill_raw, recognizer, samples, seed):
+    """
+    coarse-to-fine 탐색이 전체 탐색과 같은 템플릿을 고르는지 확인 (PYRAMID_LEVELS/PYRAMID_TOP_K 변경 시 회귀 확인용).
+    얼굴 템플릿 전체와 캐릭터당 잠재력 samples개(0이면 전체)를 각각 ROI 크기의 합성 영상에 붙여
+    두 탐색의 결과를 비교합니다. 하나라도 다르면 ok=False (main 종료 코드 1)
+    """
+    from src.capture import CapturePlan
+    from src.load_image import ScaledTemplateCache
+    from src.matcher import coarse_to_fine_face
+
+    geo = {"x": 0, "y": 0, "w": size[0], "h": size[1], "focused": True}
+    plan = CapturePlan(geo)
+    face_shape = tuple(s.stop - s.start for s in plan.face_slices[0])
+    card_shape = tuple(s.stop - s.start for s in plan.card_slices[0])
+    cache = ScaledTemplateCache(face_raw, skill_raw)
+    faces, skills = cache.get(geo)
+    coarse_faces, coarse_skills = cache.get_coarse(geo)
+    rng = np.random.default_rng(seed)
+
+    recognizer.face_index = None
+    face_mismatches = []
+    for char_name, (face_img, _) in faces.items():
+        gray = _embed(rng, face_shape, face_img)
+        exhaustive = recognizer.search_face(gray, faces)[0]
+        coarse = coarse_to_fine_face(gray, faces, coarse_faces)[0]
+        if exhaustive != coarse:
+            face_mismatches.append([char_name, exhaustive, coarse])
+
+    skill_mismatches = []
+    skill_total = 0
+    for char_name, templates in skills.items():
+        files = sorted(templates)
+        if samples:
+            files = [files[i] for i in sorted(rng.choice(len(files), min(samples, len(files)), replace=False))]
+        for filename in files:
+            gray = _embed(rng, card_shape, templates[filename])
+            exhaustive = recognizer.search_skill_set(gray, char_name, templates)[0]
+            coarse = recognizer.search_skill_set(gray, char_name, templates, coarse_skills[char_name])[0]
+            skill_total += 1
+            if exhaustive != coarse:
+                skill_mismatches.append([char_name, filename, exhaustive, coarse])
+
+    rows = []
+    for engine, total, mismatches in (("face", len(faces), face_mismatches),
+                                      ("skill", skill_total, skill_mismatches)):
+        rows.append({"stage": "pyramid", "engine": engine, "resolution": label, "n": total,
+                     "levels": PYRAMID_LEVELS, "top_k": PYRAMID_TOP_K,
+                     "correct": total - len(mismatches), "total": total,
+                     "mismatches": mismatches, "ok": not mismatches})
+    return rows
+
+def bench_steady_state(label, size, face_raw, skill_raw, build_file, ticks, seed):
+    """
+    평상시 스캔 루프의 메모리 할당 확인 (tracemalloc).
+    MatcherWorker.scan_tick을 같은 화면으로 반복해 인식/버퍼 준비를 끝낸 뒤,
+    - idle: 화면 변화가 없는 틱 (캡처 + 변화 감지)
+      -> 틱마다 새 할당이 mss 캡처 버퍼(capture_bytes, mss가 grab마다 새로 만듦) + STEADY_TICK_ALLOC_LIMIT 이하여야 함
+    - recheck: 매 틱 강제로 다시 인식 (추적 모드 재확인 경로) -> 참고용으로 할당량만 기록
+      (작업 버퍼는 풀에서 재사용하지만, 마스크 matchTemplate 내부 임시 행렬 등 OpenCV 안쪽 할당이 남음.
+       전체 탐색 틱은 FFT 배치 점수 계산이 호출마다 임시 배열을 할당하므로 할당 없는 경로가 아님)
+    """
+    from src.capture import CapturePlan
+    from src.worker import MatcherWorker
+    from src.window_tracker import FakeGeometryProvider
+    from src.anchor import AnchorStore
+
+    geo = {"x": 0, "y": 0, "w": size[0], "h": size[1], "focused": True}
+    rng = np.random.default_rng(seed)
+    chars = sorted(c for c in face_raw if c in skill_raw and skill_raw[c])
+    picks = []
+    for _ in ROIS:
+        char_name = chars[rng.integers(len(chars))]
+        files = sorted(skill_raw[char_name])
+        picks.append((char_name, files[rng.integers(len(files))]))
+    source = RawFrameSource(synthesize_frame(CapturePlan(geo), geo, picks, face_raw, skill_raw, seed))
+
+    worker = MatcherWorker(build_file, geometry_provider=FakeGeometryProvider(geo))
+    worker.recognizer.anchor_store = AnchorStore(path=None)
+    template_cache = worker.load_resources()
+    worker.recognizer.template_store.preload([c for c, _ in picks], geo)
+    # configure_threads는 프로세스 전체의 OpenCV 스레드 수를 바꾸므로 끝나면 되돌림 (다음 해상도 측정에 영향 없도록)
+    cv_threads = cv2.getNumThreads()
+    worker.configure_threads()
+
+    def run(recheck, count):
+        for _ in range(count):
+            if recheck:
+                for detector in worker.change_detectors:
+                    detector.request_recheck()
+            worker.scan_tick(source, geo, template_cache)
+            worker.publish()
+
+    def traced(recheck):
+        """반환값: (틱당 최대 추가 할당 바이트, 전체 순증가 바이트)"""
+        # 준비 (인식, 버퍼/뱅크 생성). 변화 감지가 안정화 대기 후 인식하므로 측정 틱 수와 무관하게 충분히 돌림
+        run(recheck, max(ticks, CHANGE_MAX_WAIT_FRAMES))
+        tracemalloc.start()
+        try:
+            begin = tracemalloc.get_traced_memory()[0]
+            peak = 0
+            for _ in range(ticks):
+                current = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+                if recheck:
+                    for detector in worker.change_detectors:
+                        detector.request_recheck()
+                worker.scan_tick(source, geo, template_cache)
+                worker.publish()
+                peak = max(peak, tracemalloc.get_traced_memory()[1] - current)
+            net = tracemalloc.get_traced_memory()[0] - begin
+        finally:
+            tracemalloc.stop()
+        return peak, net
+
+    rows = []
+    try:
+        for mode in ("idle", "recheck"):
+            peak, net = traced(mode == "recheck")
+            row = {"stage": "steady_state", "engine": mode, "resolution": label, "n": ticks,
+                   "tick_alloc_bytes": peak, "capture_bytes": len(source.raw), "net_bytes": net}
+            if mode == "idle":
+                row["ok"] = peak <= len(source.raw) + STEADY_TICK_ALLOC_LIMIT and net <= STEADY_TICK_ALLOC_LIMIT
+            rows.append(row)
+    finally:
+        worker.recognizer.template_store.shutdown()
+        if worker.executor is not None:
+            worker.executor.shutdown(wait=True)
+        cv2.setNumThreads(cv_threads)
+    return rows
+
+def run_benchmarks(resolutions, repeat, build_file, seed=0, include_load=True,
+                   pyramid_samples=PYRAMID_CHECK_SAMPLES):
+    """벤치마크 전체 실행. 반환값: 메타 정보와 결과 행 목록을 담은 dict"""
+    from src.load_image import load_templates
+    from src.load_build import BuildLoader
+    from src.recognizer import RoiRecognizer
+
+    face_raw, skill_raw = load_templates(TEMPLATE_FOLDER)
+    build_loader = BuildLoader(build_file)
+    recognizer = RoiRecognizer(tracking=False)
+
+    results = []
+    if include_load:
+        results.extend(bench_load_templates(max(1, repeat // 10)))
+    for label in resolutions:
+        results.extend(bench_resolution(label, RESOLUTIONS[label], face_raw, skill_raw,
+                                        build_loader, recognizer, repeat, seed))
+        results.extend(bench_pyramid_equivalence(label, RESOLUTIONS[label], face_raw, skill_raw,
+                                                 recognizer, pyramid_samples, seed))
+        results.extend(bench_steady_state(label, RESOLUTIONS[label], face_raw, skill_raw,
+                                          build_file, repeat, seed))
+
+    return {
+        "app_version": __version__,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "opencv": cv2.__version__,
+        "numpy": np.__version__,
+        "cpu_count": os.cpu_count(),
+        "repeat": repeat,
+        "seed": seed,
+        "results": results,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="인식 단계별 마이크로벤치마크 (합성 장면)")
+    parser.add_argument("--resolutions", nargs="+", choices=list(RESOLUTIONS), default=list(RESOLUTIONS))
+    parser.add_argument("--repeat", type=int, default=20, help="단계별 반복 측정 횟수")
+    parser.add_argument("--seed", type=int, default=0, help="합성 장면 시드")
+    parser.add_argument("--build", default=os.path.join(BUILDS_FOLDER, DEFAULT_BUILD_FILE), help="빌드 JSON 경로")
+    parser.add_argument("--skip-load", action="store_true", help="load_templates 측정 생략")
+    parser.add_argument("--pyramid-samples", type=int, default=PYRAMID_CHECK_SAMPLES,
+                        help="coarse-to-fine 일치 검사에서 캐릭터당 확인할 잠재력 수 (0이면 전체)")
+    parser.add_argument("--output", help="결과 JSON 저장 경로 (생략 시 표준 출력)")
+    args = parser.parse_args(argv)
+
+    # 로딩 로그가 표준 출력의 JSON 결과와 섞이지 않도록 stderr로 보냄
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run_benchmarks(args.resolutions, args.repeat, args.build, args.seed, not args.skip_load,
+                                args.pyramid_samples)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+        for row in report["results"]:
+            head = f"{row['stage']:<15}{row['engine']:<20}{row['resolution'] or '-':<7}"
+            verdict = "" if "ok" not in row else (" OK" if row["ok"] else " 실패")
+            if "median_ms" in row:
+                accuracy = f" ({row['correct']}/{row['total']})" if "correct" in row else ""
+                print(f"{head}{row['median_ms']:>10.3f} ms{accuracy}")
+            elif row["stage"] == "steady_state":
+                print(f"{head}{row['tick_alloc_bytes'] - row['capture_bytes']:>10} B/틱 (캡처 버퍼 제외){verdict}")
+            elif row["stage"] == "pyramid":
+                print(f"{head}{row['correct']:>6}/{row['total']} 전체 탐색과 일치{verdict}")
+    else:
+        print(text)
+
+    # 검사 항목(ok)이 하나라도 실패하면 종료 코드 1
+    failed = [row for row in report["results"] if row.get("ok") is False]
+    for row in failed:
+        print(f"[벤치마크] 검사 실패: {row['stage']} / {row['engine']} / {row['resolution']}", file=sys.stderr)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
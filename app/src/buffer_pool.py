@@ -0,0 +1,45 @@
+import cv2
+import numpy as np
+
+class BufferPool:
+    """
+    ROI 하나가 틱마다 쓰는 작업 버퍼(흑백 변환, 축소, 매칭 결과 등)를 (용도, 크기)별로 한 번만 할당해 재사용합니다.
+    ROI마다 별도 풀을 쓰므로 ROI 스레드끼리 버퍼를 공유하지 않습니다.
+    게임 창 크기가 바뀌면 clear()로 이전 크기 버퍼를 해제합니다.
+    """
+    def __init__(self):
+        self._buffers = {}
+
+    def get(self, name, shape, dtype=np.uint8):
+        key = (name, shape, dtype)
+        buf = self._buffers.get(key)
+        if buf is None:
+            buf = np.empty(shape, dtype=dtype)
+            self._buffers[key] = buf
+        return buf
+
+    def clear(self):
+        self._buffers.clear()
+
+    def nbytes(self):
+        return sum(buf.nbytes for buf in self._buffers.values())
+
+def to_gray(frame, buffers=None, name="gray"):
+    """BGRA -> 흑백 (buffers가 있으면 결과를 풀 버퍼에 기록)"""
+    if buffers is None:
+        return cv2.cvtColor(frame, cv2.COLOR_BGRA2GRAY)
+    return cv2.cvtColor(frame, cv2.COLOR_BGRA2GRAY, dst=buffers.get(name, frame.shape[:2]))
+
+def match_template(image, templ, method, mask=None, buffers=None, name="match"):
+    """cv2.matchTemplate (buffers가 있으면 결과 행렬을 풀 버퍼에 기록)"""
+    if buffers is None:
+        return cv2.matchTemplate(image, templ, method, mask=mask)
+    shape = (image.shape[0] - templ.shape[0] + 1, image.shape[1] - templ.shape[1] + 1)
+    return cv2.matchTemplate(image, templ, method, result=buffers.get(name, shape, np.float32), mask=mask)
+
+def pyr_down(img, buffers=None, name="pyr"):
+    """cv2.pyrDown (buffers가 있으면 결과를 풀 버퍼에 기록)"""
+    if buffers is None:
+        return cv2.pyrDown(img)
+    shape = ((img.shape[0] + 1) // 2, (img.shape[1] + 1) // 2)
+    return cv2.pyrDown(img, dst=buffers.get(name, shape))
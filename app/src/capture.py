@@ -0,0 +1,77 @@
+import numpy as np
+
+from config import ROIS, FACE_OFFSET
+from src.load_resolution import get_capture_area
+
+def geometry_key(geo):
+    """캡처 계획 재사용 여부를 판단하기 위한 geo 키"""
+    return (geo["x"], geo["y"], geo["w"], geo["h"])
+
+class CapturePlan:
+    """
+    geo 하나에 대해 모든 ROI(카드 + 얼굴) 영역을 감싸는 합집합 사각형을 미리 계산해 둡니다.
+    틱마다 합집합 영역을 한 번만 캡처하고, 각 영역은 NumPy 슬라이스 뷰(복사 없음)로 나눠 줍니다.
+    """
+    def __init__(self, geo):
+        self.key = geometry_key(geo)
+
+        face_areas = [get_capture_area(geo, roi, FACE_OFFSET) for roi in ROIS]
+        card_areas = [get_capture_area(geo, roi, None) for roi in ROIS]
+
+        # 기존 로직과 동일: 화면 밖(음수 좌표)으로 나간 얼굴 영역은 인식하지 않음
+        self.face_valid = [a["left"] >= 0 and a["top"] >= 0 for a in face_areas]
+
+        areas = card_areas + [a for a, ok in zip(face_areas, self.face_valid) if ok]
+        left = min(a["left"] for a in areas)
+        top = min(a["top"] for a in areas)
+        right = max(a["left"] + a["width"] for a in areas)
+        bottom = max(a["top"] + a["height"] for a in areas)
+
+        # mss 캡처용 합집합 영역
+        self.monitor = {"top": top, "left": left, "width": right - left, "height": bottom - top}
+
+        self.face_slices = [
+            self._to_slices(a) if ok else None
+            for a, ok in zip(face_areas, self.face_valid)
+        ]
+        self.card_slices = [self._to_slices(a) for a in card_areas]
+
+    def _to_slices(self, area):
+        """절대 좌표 영역 -> 합집합 프레임 기준 (행, 열) 슬라이스"""
+        y = area["top"] - self.monitor["top"]
+        x = area["left"] - self.monitor["left"]
+        return (slice(y, y + area["height"]), slice(x, x + area["width"]))
+
+    def matches(self, geo):
+        return self.key == geometry_key(geo)
+
+    def grab(self, sct):
+        """
+        합집합 영역을 한 번 캡처합니다. 실패 시 None
+        mss 캡처 결과는 원본 BGRA 바이트를 복사 없이 (h, w, 4) 배열로 감쌉니다.
+        (리플레이/벤치마크 프레임 소스처럼 배열을 돌려주면 그대로 사용)
+        """
+        try:
+            shot = sct.grab(self.monitor)
+        except Exception:
+            return None
+        raw = getattr(shot, "raw", None)
+        if raw is None:
+            return np.asarray(shot)
+        return np.frombuffer(raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+
+    def face_view(self, frame, index):
+        if frame is None or self.face_slices[index] is None:
+            return None
+        return frame[self.face_slices[index]]
+
+    def card_view(self, frame, index):
+        if frame is None:
+            return None
+        return frame[self.card_slices[index]]
+
+def get_capture_plan(plan, geo):
+    """geo가 바뀌지 않았다면 기존 계획을 그대로 재사용합니다."""
+    if plan is not None and plan.matches(geo):
+        return plan
+    return CapturePlan(geo)
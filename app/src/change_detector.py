@@ -0,0 +1,121 @@
+import cv2
+import numpy as np
+
+from config import CHANGE_SAMPLE_STEP, CHANGE_BLOCK_SIZE, CHANGE_THRESHOLD, SETTLE_FRAMES, CHANGE_MAX_WAIT_FRAMES
+
+class RoiChangeDetector:
+    """
+    ROI 하나의 화면 변화를 저비용으로 감지합니다.
+    다운샘플한 픽셀을 작은 블록으로 나눠 블록별 평균 절대 차이의 최댓값으로 변화를 판단합니다.
+    (ROI 전체 평균은 잠재력 아이콘만 바뀌는 경우 차이가 묻혀 버림)
+    비교 기준은 마지막으로 인식한 시점의 샘플이므로 서서히 바뀌는 화면도 누적되어 감지되고,
+    변화 후 SETTLE_FRAMES 동안 화면이 멈춰 있으면 그때 한 번만 인식을 요청합니다.
+    샘플/차이 버퍼는 ROI 크기가 바뀔 때만 새로 할당하고, 평상시 틱에서는 재사용합니다.
+    """
+    def __init__(self, step=CHANGE_SAMPLE_STEP, threshold=CHANGE_THRESHOLD, block=CHANGE_BLOCK_SIZE,
+                 settle_frames=SETTLE_FRAMES, max_wait_frames=CHANGE_MAX_WAIT_FRAMES):
+        self.step = step
+        self.threshold = threshold
+        self.block = block
+        self.settle_frames = settle_frames
+        self.max_wait_frames = max_wait_frames
+        self._shapes = None
+        self._buffers = None
+        self._reference = None
+        self._diff = None
+        self._blocks = None
+        self.reset()
+
+    def reset(self):
+        """다음 update에서 반드시 다시 인식하도록 상태 초기화"""
+        self.prev_sample = None
+        self.has_reference = False
+        self.stable_count = 0
+        self.wait_count = 0
+        self.pending = True
+
+    def request_recheck(self):
+        """화면 변화가 없어도 다음 update에서 다시 인식하도록 요청 (안정화된 화면이면 즉시)"""
+        self.pending = True
+
+    def _allocate(self, shapes):
+        """ROI 크기가 바뀜: 버퍼 재할당 (이전 샘플/기준 샘플과는 비교 불가)"""
+        self._shapes = shapes
+        total = sum(h * w * c for h, w, c in shapes)
+        self._buffers = (np.empty(total, dtype=np.float32), np.empty(total, dtype=np.float32))
+        self._reference = np.empty(total, dtype=np.float32)
+        self._diff = np.empty(total, dtype=np.float32)
+        self._blocks = [np.empty((max(1, h // self.block), max(1, w // self.block), c), dtype=np.float32)
+                        for h, w, c in shapes]
+        self.prev_sample = None
+        self.has_reference = False
+        self.pending = True
+
+    def _sample(self, views):
+        """
+        다운샘플한 픽셀을 float32 버퍼 하나에 이어서 기록 (직전 샘플과 버퍼를 번갈아 사용)
+        정수 배열의 mean()은 형 변환용 임시 버퍼를 할당하므로 float32로 보관합니다.
+        """
+        parts = [v[::self.step, ::self.step, :3] for v in views if v is not None]
+        if not parts:
+            return None
+
+        shapes = [p.shape for p in parts]
+        if shapes != self._shapes:
+            self._allocate(shapes)
+
+        # 직전 샘플이 쓰지 않는 쪽 버퍼에 기록
+        sample = self._buffers[1] if self.prev_sample is self._buffers[0] else self._buffers[0]
+        offset = 0
+        for p in parts:
+            np.copyto(sample[offset:offset + p.size].reshape(p.shape), p, casting='unsafe')
+            offset += p.size
+        return sample
+
+    def _distance(self, a, b):
+        """두 샘플의 블록별 평균 절대 차이 중 최댓값 (INTER_AREA 축소 = 블록 평균)"""
+        diff = np.subtract(a, b, out=self._diff)
+        np.abs(diff, out=diff)
+        worst = 0.0
+        offset = 0
+        for shape, blocks in zip(self._shapes, self._blocks):
+            size = shape[0] * shape[1] * shape[2]
+            cv2.resize(diff[offset:offset + size].reshape(shape), (blocks.shape[1], blocks.shape[0]),
+                       dst=blocks, interpolation=cv2.INTER_AREA)
+            worst = max(worst, float(blocks.max()))
+            offset += size
+        return worst
+
+    def update(self, *views):
+        """
+        이번 틱의 ROI 뷰(얼굴, 카드 등)를 받아 인식 필요 여부를 반환합니다.
+        반환값: True면 무거운 매칭을 수행, False면 이전 결과 재사용
+        """
+        sample = self._sample(views)
+        if sample is None:
+            self.reset()
+            return True
+
+        if self.pending:
+            # 인식 대기 중: 직전 프레임과 비교해 화면이 멈췄는지 확인
+            moved = self.prev_sample is None or self._distance(sample, self.prev_sample) > self.threshold
+            self.stable_count = 0 if moved else self.stable_count + 1
+        elif not self.has_reference or self._distance(sample, self._reference) > self.threshold:
+            # 마지막 인식 당시 화면과 달라짐 -> 안정화 후 다시 인식
+            self.pending = True
+            self.stable_count = 0
+        self.prev_sample = sample
+
+        if not self.pending:
+            return False
+
+        # 변화가 멈춘 뒤 N프레임 안정되면 한 번 인식 (계속 흔들리는 화면은 최대 대기 후 강제 인식)
+        self.wait_count += 1
+        if self.stable_count >= self.settle_frames or self.wait_count >= self.max_wait_frames:
+            self.pending = False
+            self.wait_count = 0
+            np.copyto(self._reference, sample)
+            self.has_reference = True
+            return True
+
+        return False
@@ -0,0 +1,12 @@
+import os
+
+def atomic_write(path, data, mode='wb'):
+    """
+    임시 파일에 쓴 뒤 교체 (저장 도중 종료되어도 기존 파일 유지)
+    mode: 'wb'(bytes) 또는 'w'(str, UTF-8)
+    """
+    tmp_path = path + ".tmp"
+    encoding = None if 'b' in mode else 'utf-8'
+    with open(tmp_path, mode, encoding=encoding) as f:
+        f.write(data)
+    os.replace(tmp_path, path)
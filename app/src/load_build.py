@@ -1,5 +1,6 @@
 import json
 import os
+from collections import OrderedDict
 
 class BuildLoader:
     def __init__(self, build_file_path="builds.json"):
@@ -41,4 +42,60 @@ class BuildLoader:
         skill_key = os.path.splitext(filename)[0]
         
         # 설정된 값 반환 (없으면 0)
-        return self.target_map[char_name].get(skill_key, 0)
\ No newline at end of file
+        return self.target_map[char_name].get(skill_key, 0)
+
+class BuildCandidates:
+    """
+    빌드 우선 탐색용 후보 목록 (빌드가 바뀔 때마다 한 번 생성).
+    템플릿 세트를 빌드 포함 / 나머지로 나눈 결과를 템플릿 객체별로 캐싱해
+    매 틱 다시 나누지 않습니다.
+    """
+    MAX_SPLITS = 4
+
+    def __init__(self, target_map):
+        self.chars = set(target_map)
+        self.skill_keys = {char_name: set(skills) for char_name, skills in target_map.items()}
+        self._face_splits = OrderedDict()
+        self._skill_splits = {}
+
+    @staticmethod
+    def _split(templates, keep):
+        build, rest = {}, {}
+        for name, value in templates.items():
+            (build if keep(name) else rest)[name] = value
+        return build, rest
+
+    def split_faces(self, face_templates):
+        """반환값: (빌드 캐릭터 얼굴, 나머지 얼굴)"""
+        cached = self._face_splits.get(id(face_templates))
+        if cached is not None and cached[0] is face_templates:
+            return cached[1]
+
+        split = self._split(face_templates, lambda char_name: char_name in self.chars)
+        self._face_splits[id(face_templates)] = (face_templates, split)
+        while len(self._face_splits) > self.MAX_SPLITS:
+            self._face_splits.popitem(last=False)
+        return split
+
+    def split_skills(self, char_name, templates, coarse=None):
+        """
+        반환값: ((빌드 잠재력, 축소본), (나머지 잠재력, 축소본))
+        빌드에 없는 캐릭터이거나 빌드 잠재력이 템플릿에 하나도 없으면 None
+        """
+        keys = self.skill_keys.get(char_name)
+        if not keys:
+            return None
+
+        cached = self._skill_splits.get(char_name)
+        if cached is not None and cached[0] is templates and cached[1] is coarse:
+            return cached[2]
+
+        keep = lambda filename: os.path.splitext(filename)[0] in keys
+        build, rest = self._split(templates, keep)
+        if not build:
+            split = None
+        else:
+            build_coarse, rest_coarse = self._split(coarse, keep) if coarse else (None, None)
+            split = ((build, build_coarse), (rest, rest_coarse))
+        self._skill_splits[char_name] = (templates, coarse, split)
+        return split
@@ -1,7 +1,12 @@
 import os
 import cv2
+import json
+import hashlib
 import numpy as np
-import pickle
+from collections import OrderedDict
+
+from config import REFERENCE_WIDTH, SCALED_TEMPLATE_CACHE_SIZE, PYRAMID_LEVELS, TEMPLATE_FULL_CHECK
+from src.file_utils import atomic_write
 
 def create_mask(h, w):
     """흰색 원, 검은 배경의 마스크 생성"""
@@ -11,99 +16,333 @@ def create_mask(h, w):
     cv2.circle(mask, center, radius, 255, -1)
     return mask
 
-def get_latest_mtime(folder_path):
-    """폴더 내 모든 파일 중 가장 최근 수정 시간을 반환"""
-    latest_time = 0
-    for root, _, files in os.walk(folder_path):
-        for file in files:
-            if file.lower().endswith(('.png', '.jpg')):
-                full_path = os.path.join(root, file)
-                mtime = os.path.getmtime(full_path)
-                if mtime > latest_time:
-                    latest_time = mtime
-    return latest_time
-
-def load_templates(base_folder):
+# =========================================================
+# 샤드 캐시 (캐릭터 폴더 단위)
+# templates/cache/manifest.json : 샤드별 폴더 mtime, 파일별 (size, mtime, hash), 블롭 인덱스
+# templates/cache/<shard>.pack  : 샤드 템플릿을 이어 붙인 uint8 블롭 (np.memmap으로 읽음)
+# =========================================================
+CACHE_DIR = "cache"
+MANIFEST_FILE = "manifest.json"
+CACHE_VERSION = 2
+IMAGE_EXTS = ('.png', '.jpg')
+LEGACY_CACHE_FILES = ("templates.cache", "templates.pack", "templates.index.json")
+
+def _shard_pack_name(key):
+    return key.replace("/", ".") + ".pack"
+
+def _scan_files(dir_path):
+    """폴더 내 이미지 파일의 (size, mtime_ns) 수집"""
+    files = {}
+    for filename in os.listdir(dir_path):
+        if not filename.lower().endswith(IMAGE_EXTS): continue
+        st = os.stat(os.path.join(dir_path, filename))
+        files[filename] = {"size": st.st_size, "mtime": st.st_mtime_ns}
+    return files
+
+def _file_hash(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def load_manifest(base_folder):
+    path = os.path.join(base_folder, CACHE_DIR, MANIFEST_FILE)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get("version") == CACHE_VERSION:
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return {"version": CACHE_VERSION, "shards": {}}
+
+def save_manifest(base_folder, manifest):
+    atomic_write(os.path.join(base_folder, CACHE_DIR, MANIFEST_FILE), json.dumps(manifest), 'w')
+
+def _pack_is_valid(cache_dir, entry):
+    path = os.path.join(cache_dir, entry["pack"])
+    return os.path.exists(path) and os.path.getsize(path) == entry["size"]
+
+def build_shard(dir_path, cache_dir, key):
     """
-    이미지를 로드하되, pickle 캐시를 우선적으로 확인합니다.
+    폴더 하나의 이미지를 디코딩해 샤드 블롭을 새로 씁니다.
+    파일은 한 번만 읽어 해시 계산과 디코딩에 같이 사용합니다.
+    반환값: manifest 샤드 항목
     """
-    face_templates = {} 
-    skill_templates = {}
-    
-    cache_path = os.path.join(base_folder, "templates.cache")
-    
-    # 1. 캐시 유효성 검사
-    # 캐시 파일이 존재하고, 이미지 폴더보다 나중에 만들어졌다면 캐시를 씁니다.
-    if os.path.exists(cache_path):
-        cache_mtime = os.path.getmtime(cache_path)
-        last_image_mtime = get_latest_mtime(base_folder)
-        
-        if cache_mtime > last_image_mtime:
-            print(">>> [시스템] 캐시된 데이터 로드 중... (Fast Load)")
+    stats = _scan_files(dir_path)
+    files, entries, chunks = {}, [], []
+    offset = 0
+
+    for filename in sorted(stats):
+        with open(os.path.join(dir_path, filename), 'rb') as f:
+            raw = f.read()
+        meta = dict(stats[filename], hash=hashlib.sha1(raw).hexdigest())
+        files[filename] = meta
+
+        img = cv2.imdecode(np.frombuffer(raw, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+        if img is None: continue
+        data = np.ascontiguousarray(img)
+        chunks.append(data.tobytes())
+        entries.append([filename, offset, list(data.shape)])
+        offset += data.nbytes
+
+    pack_name = _shard_pack_name(key)
+    atomic_write(os.path.join(cache_dir, pack_name), b"".join(chunks))
+
+    return {
+        "dir_mtime": os.stat(dir_path).st_mtime_ns,
+        "files": files,
+        "pack": pack_name,
+        "size": offset,
+        "entries": entries,
+    }
+
+def sync_shard(manifest, dir_path, cache_dir, key, full_check=False):
+    """
+    샤드가 최신인지 확인하고 필요할 때만 재생성합니다.
+    - 폴더 mtime이 같으면 파일은 stat하지 않고 그대로 사용 (full_check=True면 파일까지 확인)
+    - 폴더가 바뀌었으면 파일 size/mtime을 비교하고, 달라진 파일만 해시로 내용 변경을 확인
+    반환값: (entry, status) - status는 "fresh" / "touched"(메타만 갱신) / "rebuilt"
+    """
+    old = manifest["shards"].get(key)
+    dir_mtime = os.stat(dir_path).st_mtime_ns
+
+    if old and _pack_is_valid(cache_dir, old):
+        if old["dir_mtime"] == dir_mtime and not full_check:
+            return old, "fresh"
+
+        stats = _scan_files(dir_path)
+        if set(stats) == set(old["files"]):
+            same = True
+            for filename, meta in stats.items():
+                prev = old["files"][filename]
+                if prev["size"] == meta["size"] and prev["mtime"] == meta["mtime"]:
+                    continue
+                if prev["size"] != meta["size"] or _file_hash(os.path.join(dir_path, filename)) != prev["hash"]:
+                    same = False
+                    break
+
+            if same:
+                # 내용은 그대로 (복사/터치 등) -> 메타만 갱신
+                files = {name: dict(meta, hash=old["files"][name]["hash"]) for name, meta in stats.items()}
+                entry = dict(old, dir_mtime=dir_mtime, files=files)
+                if entry == old:
+                    return old, "fresh"
+                manifest["shards"][key] = entry
+                return entry, "touched"
+
+    entry = build_shard(dir_path, cache_dir, key)
+    manifest["shards"][key] = entry
+    return entry, "rebuilt"
+
+def read_shard(cache_dir, entry):
+    """샤드 블롭을 np.memmap으로 열어 {filename: 읽기 전용 뷰} 반환 (복사 없음)"""
+    if entry["size"] == 0:
+        return {}
+    blob = np.memmap(os.path.join(cache_dir, entry["pack"]), dtype=np.uint8, mode='r')
+    views = {}
+    for filename, offset, shape in entry["entries"]:
+        size = int(np.prod(shape))
+        views[filename] = blob[offset:offset + size].reshape(shape)
+    return views
+
+def faces_from_views(views):
+    """아이콘 뷰 -> {char_name: (img, mask)} (마스크는 크기별로 한 번만 생성해 공유)"""
+    face_templates = {}
+    masks = {}
+    for filename, img in views.items():
+        if img.shape not in masks:
+            masks[img.shape] = create_mask(*img.shape)
+        face_templates[os.path.splitext(filename)[0]] = (img, masks[img.shape])
+    return face_templates
+
+def prepare_cache_dir(base_folder):
+    """캐시 폴더를 만들고, 이전 버전 캐시(pickle / 단일 블롭)를 정리합니다. 반환값: 캐시 폴더 경로"""
+    cache_dir = os.path.join(base_folder, CACHE_DIR)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    for legacy in LEGACY_CACHE_FILES:
+        legacy_path = os.path.join(base_folder, legacy)
+        if os.path.exists(legacy_path):
             try:
-                with open(cache_path, 'rb') as f:
-                    data = pickle.load(f)
-                print(">>> 로딩 완료 (Cached).\n")
-                return data['face'], data['skill']
-            except Exception as e:
-                print(f"[경고] 캐시 로드 실패 (손상됨): {e}")
-                # 실패하면 아래 로직(새로 로딩)으로 넘어감
-        else:
-            print(">>> [시스템] 변경사항 감지됨. 템플릿 재생성 중...")
-    else:
-        print(">>> [시스템] 초기 리소스 로딩 및 캐시 생성 중...")
+                os.remove(legacy_path)
+            except OSError:
+                pass
+    return cache_dir
 
-    # ----------------------------------------------------
-    # 2. 원본 이미지 로딩 수행
-    # ----------------------------------------------------
+def list_shard_dirs(base_folder):
+    """샤드 대상 폴더 목록 {key: 경로} - icons + potentials/<캐릭터>"""
     icons_path = os.path.join(base_folder, "icons")
     potentials_path = os.path.join(base_folder, "potentials")
 
+    shard_dirs = {}
+    if os.path.isdir(icons_path):
+        shard_dirs["icons"] = icons_path
+    if os.path.isdir(potentials_path):
+        for char_folder in os.listdir(potentials_path):
+            char_path = os.path.join(potentials_path, char_folder)
+            if os.path.isdir(char_path):
+                shard_dirs[f"potentials/{char_folder}"] = char_path
+    return shard_dirs
+
+def prune_shards(manifest, shard_dirs, cache_dir):
+    """사라진 폴더의 샤드를 manifest와 디스크에서 정리. 반환값: 정리된 샤드 key 목록"""
+    removed = []
+    for key in list(manifest["shards"]):
+        if key not in shard_dirs:
+            stale = manifest["shards"].pop(key)
+            removed.append(key)
+            try:
+                os.remove(os.path.join(cache_dir, stale["pack"]))
+            except OSError:
+                pass
+    return removed
+
+def load_templates(base_folder, full_check=TEMPLATE_FULL_CHECK):
+    """
+    이미지를 로드하되, 폴더(캐릭터) 단위 샤드 캐시를 우선적으로 사용합니다.
+    바뀐 폴더의 샤드만 다시 만들고, 나머지는 메모리 매핑으로 바로 읽습니다.
+    (폴더 mtime만 확인하므로, 파일을 제자리에서 덮어쓴 경우 full_check=True(TEMPLATE_FULL_CHECK)로 강제 확인)
+    모든 캐릭터를 한 번에 읽으므로 배치 처리용이며, 실시간 감시는 SkillTemplateStore로 지연 로딩합니다.
+    """
+    face_templates = {} 
+    skill_templates = {}
+
     if not os.path.exists(base_folder):
         return {}, {}
 
-    # (A) 얼굴 아이콘 로딩 + 마스크 생성
-    if os.path.exists(icons_path):
-        for filename in os.listdir(icons_path):
-            if not filename.lower().endswith(('.png', '.jpg')): continue
-            
-            char_name = os.path.splitext(filename)[0]
-            full_path = os.path.join(icons_path, filename)
-            
-            img = cv2.imread(full_path, 0)
-            if img is None: continue
-            
-            h, w = img.shape
-            mask = create_mask(h, w)
-            face_templates[char_name] = (img, mask)
-    
-    # (B) 잠재력(스킬) 로딩
-    if os.path.exists(potentials_path):
-        for char_folder in os.listdir(potentials_path):
-            char_path = os.path.join(potentials_path, char_folder)
-            if not os.path.isdir(char_path): continue
-            
-            char_name = char_folder
-            if char_name not in skill_templates:
-                skill_templates[char_name] = {}
-
-            for filename in os.listdir(char_path):
-                if not filename.lower().endswith(('.png', '.jpg')): continue
-                full_path = os.path.join(char_path, filename)
-                img = cv2.imread(full_path, 0)
-                if img is None: continue
-                skill_templates[char_name][filename] = img
-
-    # ----------------------------------------------------
-    # 3. 캐시 파일 저장 (Pickle Dump)
-    # ----------------------------------------------------
-    try:
-        with open(cache_path, 'wb') as f:
-            # 딕셔너리로 묶어서 저장
-            pickle.dump({'face': face_templates, 'skill': skill_templates}, f)
-        print(f">>> [시스템] 캐시 파일 생성 완료: {cache_path}")
-    except Exception as e:
-        print(f"[오류] 캐시 저장 실패: {e}")
+    cache_dir = prepare_cache_dir(base_folder)
+    manifest = load_manifest(base_folder)
+    old_manifest = json.dumps(manifest, sort_keys=True)
+
+    # 1. 대상 폴더 목록: icons + potentials/<캐릭터>
+    shard_dirs = list_shard_dirs(base_folder)
+
+    # 2. 샤드별 유효성 검사 및 필요한 샤드만 재생성
+    rebuilt = []
+    for key, dir_path in shard_dirs.items():
+        try:
+            entry, status = sync_shard(manifest, dir_path, cache_dir, key, full_check)
+        except Exception as e:
+            print(f"[오류] 템플릿 샤드 처리 실패 ({key}): {e}")
+            continue
+        if status == "rebuilt":
+            rebuilt.append(key)
+
+        views = read_shard(cache_dir, entry)
+        if key == "icons":
+            face_templates = faces_from_views(views)
+        else:
+            skill_templates[key.split("/", 1)[1]] = views
 
+    # 3. 사라진 폴더의 샤드 정리
+    prune_shards(manifest, shard_dirs, cache_dir)
+
+    if json.dumps(manifest, sort_keys=True) != old_manifest:
+        try:
+            save_manifest(base_folder, manifest)
+        except Exception as e:
+            print(f"[오류] 캐시 저장 실패: {e}")
+
+    if rebuilt:
+        print(f">>> [시스템] 변경된 템플릿 샤드 재생성: {len(rebuilt)}/{len(shard_dirs)}개")
     print(f">>> 로딩 완료.\n")
-    return face_templates, skill_templates
\ No newline at end of file
+    return face_templates, skill_templates
+
+def scale_template(img, scale):
+    """템플릿 한 장을 게임 해상도 배율에 맞게 리사이즈"""
+    h, w = img.shape[:2]
+    new_w = max(1, int(round(w * scale)))
+    new_h = max(1, int(round(h * scale)))
+    interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
+    return cv2.resize(img, (new_w, new_h), interpolation=interpolation)
+
+def scale_templates(face_templates, skill_templates, scale):
+    """
+    전체 템플릿 세트를 지정 배율로 스케일합니다.
+    얼굴 마스크는 보간 대신 새 크기로 다시 생성합니다.
+    """
+    if scale == 1.0:
+        return face_templates, skill_templates
+
+    scaled_faces = {}
+    for char_name, (face_img, _) in face_templates.items():
+        img = scale_template(face_img, scale)
+        h, w = img.shape
+        scaled_faces[char_name] = (img, create_mask(h, w))
+
+    scaled_skills = {
+        char_name: scale_skill_set(skills, scale) for char_name, skills in skill_templates.items()
+    }
+
+    return scaled_faces, scaled_skills
+
+def scale_skill_set(skills, scale):
+    """캐릭터 한 명의 스킬 템플릿 {filename: img}를 지정 배율로 스케일"""
+    if scale == 1.0:
+        return skills
+    return {filename: scale_template(img, scale) for filename, img in skills.items()}
+
+def downsample_skill_set(skills, levels=PYRAMID_LEVELS):
+    """캐릭터 한 명의 스킬 템플릿을 levels번 pyrDown"""
+    coarse = {}
+    for filename, skill_img in skills.items():
+        img = skill_img
+        for _ in range(levels):
+            img = cv2.pyrDown(img)
+        coarse[filename] = img
+    return coarse
+
+def downsample_templates(face_templates, skill_templates, levels=PYRAMID_LEVELS):
+    """
+    coarse-to-fine 탐색용 축소(pyrDown) 템플릿 세트를 만듭니다.
+    얼굴 마스크는 축소된 크기로 다시 생성합니다.
+    """
+    coarse_faces = {}
+    for char_name, (face_img, _) in face_templates.items():
+        img = face_img
+        for _ in range(levels):
+            img = cv2.pyrDown(img)
+        h, w = img.shape
+        coarse_faces[char_name] = (img, create_mask(h, w))
+
+    coarse_skills = {
+        char_name: downsample_skill_set(skills, levels) for char_name, skills in skill_templates.items()
+    }
+
+    return coarse_faces, coarse_skills
+
+class ScaledTemplateCache:
+    """
+    게임 창 크기 (w, h)별로 미리 스케일된 템플릿 세트를 LRU 방식으로 보관합니다.
+    캡처 프레임은 원본 해상도 그대로 매칭하고, 창 크기가 바뀔 때만 한 번 재생성합니다.
+    """
+    def __init__(self, face_templates, skill_templates, max_entries=SCALED_TEMPLATE_CACHE_SIZE):
+        self.face_templates = face_templates
+        self.skill_templates = skill_templates
+        self.max_entries = max(1, max_entries)
+        self._entries = OrderedDict()
+
+    def _entry(self, geo):
+        key = (geo["w"], geo["h"])
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+        scale = geo["w"] / REFERENCE_WIDTH
+        entry = {"scaled": scale_templates(self.face_templates, self.skill_templates, scale), "coarse": None}
+        self._entries[key] = entry
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+        return entry
+
+    def get(self, geo):
+        """geo에 맞는 (face_templates, skill_templates) 반환"""
+        return self._entry(geo)["scaled"]
+
+    def get_coarse(self, geo):
+        """geo에 맞는 축소 템플릿 (coarse_faces, coarse_skills) 반환 (처음 요청 시 한 번 생성)"""
+        entry = self._entry(geo)
+        if entry["coarse"] is None:
+            entry["coarse"] = downsample_templates(*entry["scaled"])
+        return entry["coarse"]
@@ -1,6 +1,5 @@
 import ctypes
 from ctypes import wintypes
-import pygetwindow as gw
 from config import TARGET_GAME_TITLE
 
 # WinAPI 구조체 정의 (내부용)
@@ -8,36 +7,78 @@ class RECT(ctypes.Structure):
     _fields_ = [("left", ctypes.c_long), ("top", ctypes.c_long),
                 ("right", ctypes.c_long), ("bottom", ctypes.c_long)]
 
-def get_game_geometry():
+DPI_AWARENESS_CONTEXT_PER_MONITOR_AWARE_V2 = -4
+PROCESS_PER_MONITOR_DPI_AWARE = 2
+
+def enable_dpi_awareness():
     """
-    현재 게임 창의 정보를 가져옵니다.
-    반환값: 성공 시 {x, y, w, h}, 실패 시 None
+    모니터별 DPI 인식(Per-Monitor)으로 설정합니다. (QApplication 생성 전에 호출)
+    게임 창 좌표/캡처/오버레이 위치가 배율이 다른 보조 모니터에서도 모두 실제 픽셀 기준이 됩니다.
+    지원하지 않는 Windows에서는 Per-Monitor v1 -> 시스템 DPI 인식 순으로 대체합니다.
     """
+    user32 = ctypes.windll.user32
     try:
-        windows = gw.getWindowsWithTitle(TARGET_GAME_TITLE)
-        if not windows: return None
-        
-        hwnd = windows[0]._hWnd
-        
-        if ctypes.windll.user32.IsIconic(hwnd):
-            return None
-        
-        # 1. 내부 크기 (Client Area)
-        client_rect = RECT()
-        ctypes.windll.user32.GetClientRect(hwnd, ctypes.byref(client_rect))
-        width = client_rect.right - client_rect.left
-        height = client_rect.bottom - client_rect.top
+        if user32.SetProcessDpiAwarenessContext(ctypes.c_void_p(DPI_AWARENESS_CONTEXT_PER_MONITOR_AWARE_V2)):
+            return
+    except AttributeError:
+        pass
+    try:
+        if ctypes.windll.shcore.SetProcessDpiAwareness(PROCESS_PER_MONITOR_DPI_AWARE) == 0:
+            return
+    except (AttributeError, OSError):
+        pass
+    user32.SetProcessDPIAware()
 
-        # 2. 화면 상 절대 위치 (Client Origin)
-        point = wintypes.POINT(0, 0)
-        ctypes.windll.user32.ClientToScreen(hwnd, ctypes.byref(point))
-        
-        if width == 0 or height == 0: return None
+def find_game_window():
+    """
+    게임 창 핸들(hwnd)을 찾습니다. (모든 최상위 창을 열거하므로 비용이 큼)
+    반환값: 성공 시 hwnd, 실패 시 None
+    """
+    # pygetwindow는 Windows 전용이므로 실제 조회 시점에만 임포트
+    import pygetwindow as gw
+
+    windows = gw.getWindowsWithTitle(TARGET_GAME_TITLE)
+    if not windows: return None
+    return windows[0]._hWnd
+
+def get_window_geometry(hwnd):
+    """
+    창 핸들의 클라이언트 영역 정보를 가져옵니다.
+    반환값: 성공 시 {x, y, w, h, focused}, 최소화/크기 0이면 None
+    """
+    if ctypes.windll.user32.IsIconic(hwnd):
+        return None
+    
+    # 1. 내부 크기 (Client Area)
+    client_rect = RECT()
+    ctypes.windll.user32.GetClientRect(hwnd, ctypes.byref(client_rect))
+    width = client_rect.right - client_rect.left
+    height = client_rect.bottom - client_rect.top
+
+    # 2. 화면 상 절대 위치 (Client Origin)
+    point = wintypes.POINT(0, 0)
+    ctypes.windll.user32.ClientToScreen(hwnd, ctypes.byref(point))
+    
+    if width == 0 or height == 0: return None
+
+    # 3. 포커스 여부 (비활성 창이면 스캔 주기를 늦춤)
+    focused = ctypes.windll.user32.GetForegroundWindow() == hwnd
+
+    return {
+        "x": point.x, "y": point.y, # 창의 좌상단 절대 좌표
+        "w": width,   "h": height,  # 창의 내부 크기
+        "focused": focused
+    }
 
-        return {
-            "x": point.x, "y": point.y, # 창의 좌상단 절대 좌표
-            "w": width,   "h": height   # 창의 내부 크기
-        }
+def get_game_geometry():
+    """
+    현재 게임 창의 정보를 가져옵니다.
+    반환값: 성공 시 {x, y, w, h, focused}, 실패 시 None
+    """
+    try:
+        hwnd = find_game_window()
+        if not hwnd: return None
+        return get_window_geometry(hwnd)
     except:
         return None
 
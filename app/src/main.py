@@ -1,15 +1,18 @@
 import sys
 import os
-import ctypes
+import time
 from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, QHBoxLayout,
-                             QLabel, QComboBox, QPushButton, QCheckBox, QGroupBox, QMessageBox)
+                             QLabel, QComboBox, QPushButton, QCheckBox, QGroupBox, QMessageBox,
+                             QFileDialog)
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QFont
 
 # [모듈 임포트]
-from config import __version__, DEFAULT_BUILD_FILE, BUILDS_FOLDER, AppStatus
+from config import __version__, DEFAULT_BUILD_FILE, BUILDS_FOLDER, PROFILE_DIR, AppStatus
 from src.worker import MatcherWorker
 from src.overlay import OverlayWindow
+from src.profiler import format_summary
+from src.load_resolution import enable_dpi_awareness
 
 try:
     from sstoy_loader.build_maker import BuildMakerApp
@@ -17,7 +20,7 @@ except ImportError as e:
     print(f"⚠️ 모듈 로딩 실패: {e}")
     BuildMakerApp = None
 
-ctypes.windll.user32.SetProcessDPIAware()
+enable_dpi_awareness()
 
 class ControlPanel(QWidget):
     def __init__(self):
@@ -101,7 +104,19 @@ class ControlPanel(QWidget):
         build_group.setLayout(build_layout)
         layout.addWidget(build_group)
 
-        # 4. 하단 옵션
+        # 4. 성능 정보 (단계별 소요 시간)
+        perf_layout = QHBoxLayout()
+        self.perf_label = QLabel("성능: 측정 대기 중")
+        self.perf_label.setStyleSheet("color: #555; font-size: 8pt;")
+        perf_layout.addWidget(self.perf_label, 1)
+
+        btn_profile = QPushButton("기록 저장")
+        btn_profile.setFixedWidth(80)
+        btn_profile.clicked.connect(self.save_profile)
+        perf_layout.addWidget(btn_profile)
+        layout.addLayout(perf_layout)
+
+        # 5. 하단 옵션
         bottom_layout = QHBoxLayout()
         self.check_overlay = QCheckBox("오버레이 켜기")
         self.check_overlay.setChecked(True)
@@ -131,13 +146,12 @@ class ControlPanel(QWidget):
 
         self.worker = MatcherWorker(initial_build_path)
 
-        self.worker.match_signal.connect(self.overlay.update_result)
-        self.worker.reset_signal.connect(self.overlay.clear_all)
-        self.worker.status_signal.connect(self.update_status_text)
+        self.worker.result_signal.connect(self.overlay.update_result)
+        self.worker.result_signal.connect(self.on_tick_result)
         self.worker.initial_load_finished.connect(self.on_loading_complete)
-        self.worker.debug_signal.connect(self.overlay.update_debug_info)
         
-        self.worker.geometry_signal.connect(self.overlay.update_geometry)
+        self.worker.stats_signal.connect(self.update_stats)
+        self.worker.stats_signal.connect(self.overlay.update_stats)
 
         self.overlay.show()
         self.worker.start()
@@ -177,6 +191,10 @@ class ControlPanel(QWidget):
                 QPushButton:hover { background-color: #C8E6C9; }
             """)
 
+    def on_tick_result(self, result):
+        if result.status_changed:
+            self.update_status_text(result.status, result.status_text)
+
     def update_status_text(self, status: AppStatus, detail_text: str):
         if status == AppStatus.LOADING:
             display_text = "로딩 중..."
@@ -200,6 +218,25 @@ class ControlPanel(QWidget):
         self.status_label.setText(display_text)
         self.status_label.setStyleSheet(style)
 
+    def update_stats(self, stats):
+        self.perf_label.setText(format_summary(stats))
+
+    def save_profile(self):
+        """단계별 소요 시간 통계를 JSON/CSV 파일로 저장"""
+        try:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+        except OSError:
+            pass
+        default_path = os.path.join(PROFILE_DIR, time.strftime("profile_%Y%m%d_%H%M%S.json"))
+        path, _ = QFileDialog.getSaveFileName(self, "성능 기록 저장", default_path, "JSON (*.json);;CSV (*.csv)")
+        if not path:
+            return
+
+        try:
+            self.worker.profiler.dump(path)
+        except Exception as e:
+            QMessageBox.critical(self, "오류", f"성능 기록 저장 실패: {e}")
+
     def refresh_build_list(self):
         self.build_combo.blockSignals(True)
         self.build_combo.clear()
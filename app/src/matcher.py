@@ -0,0 +1,335 @@
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from config import SKILL_BANK_MEMORY_MB, PYRAMID_LEVELS, PYRAMID_TOP_K, FACE_INDEX_SIZE, FACE_INDEX_TOP_K
+from src.load_image import create_mask
+from src.buffer_pool import match_template, pyr_down
+
+# 같은 그림의 템플릿(동일 아이콘)은 연산 정밀도 차이로만 점수가 갈리므로,
+# 이 범위 안의 점수는 동점으로 보고 앞 순서 템플릿을 선택합니다.
+SCORE_TIE_EPSILON = 1e-4
+
+# 뱅크 하나가 스펙트럼을 보관할 프레임 크기 수
+BANK_SHAPES_PER_BANK = 2
+
+def crop_search_window(gray, loc, template_shape, ratio=0.0, margin=0):
+    """
+    매칭 위치 주변의 작은 탐색 창을 잘라냅니다. (복사 없는 뷰)
+    여유 폭은 max(margin, 템플릿 크기 x ratio, 2) 픽셀입니다.
+    반환값: (window, (x0, y0))
+    """
+    h, w = template_shape[:2]
+    margin = max(2, margin, int(max(h, w) * ratio))
+    x, y = loc
+    x0 = max(0, x - margin)
+    y0 = max(0, y - margin)
+    x1 = min(gray.shape[1], x + w + margin)
+    y1 = min(gray.shape[0], y + h + margin)
+    return gray[y0:y1, x0:x1], (x0, y0)
+
+def pyramid_down(img, levels=PYRAMID_LEVELS, buffers=None):
+    """cv2.pyrDown을 levels번 적용 (buffers가 있으면 단계별 풀 버퍼 재사용)"""
+    for level in range(levels):
+        img = pyr_down(img, buffers, ("pyr", level))
+    return img
+
+def _fits(frame, template):
+    return template.shape[0] <= frame.shape[0] and template.shape[1] <= frame.shape[1]
+
+def _window_sums(integral, h, w):
+    """적분 영상에서 h x w 창 합계를 'valid' 범위로 계산"""
+    return integral[h:, w:] - integral[:-h, w:] - integral[h:, :-w] + integral[:-h, :-w]
+
+class SkillTemplateBank:
+    """
+    캐릭터 한 명의 스킬 템플릿 전체를 한 번의 배치 연산으로 점수화합니다.
+    cv2.TM_CCOEFF_NORMED와 같은 점수를 FFT 상호상관으로 계산하며,
+    프레임 통계(FFT, 창 합계)는 한 번만 구해 모든 템플릿이 공유합니다.
+    스펙트럼은 프레임 크기로 패딩되어 크므로 float32/complex64로 계산/보관합니다.
+    (창 분산은 상쇄 오차를 피하려고 float64 적분 영상으로 계산)
+    """
+    def __init__(self, templates):
+        self.templates = templates
+        self.filenames = list(templates.keys())
+        # 프레임 크기별 컴파일 결과 (카드 전체 / 앵커 창 등 여러 크기를 번갈아 쓰므로 몇 개 보관)
+        self._compiled = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _compile(self, frame_shape):
+        """
+        프레임 크기에 맞춰 템플릿 스펙트럼을 미리 계산 (같은 크기끼리 묶음)
+        반환값: (dft_shape, groups)
+        """
+        fh, fw = frame_shape
+        dft_h = cv2.getOptimalDFTSize(fh)
+        dft_w = cv2.getOptimalDFTSize(fw)
+
+        by_shape = {}
+        for idx, filename in enumerate(self.filenames):
+            by_shape.setdefault(self.templates[filename].shape, []).append(idx)
+
+        groups = []
+        for (h, w), indices in by_shape.items():
+            # 프레임보다 큰 템플릿은 매칭 불가 -> 점수 0
+            if h > fh or w > fw:
+                continue
+
+            stack = np.stack([self.templates[self.filenames[i]] for i in indices]).astype(np.float64)
+            stack -= stack.mean(axis=(1, 2), keepdims=True)
+            norms = np.sqrt(np.einsum('nij,nij->n', stack, stack))
+
+            spectra = np.fft.rfft2(stack.astype(np.float32), s=(dft_h, dft_w)).astype(np.complex64, copy=False)
+            np.conjugate(spectra, out=spectra)
+            groups.append((np.array(indices), h, w, norms, spectra))
+
+        return (dft_h, dft_w), groups
+
+    def _get_compiled(self, frame_shape):
+        compiled = self._compiled.get(frame_shape)
+        if compiled is None:
+            compiled = self._compile(frame_shape)
+            self._compiled[frame_shape] = compiled
+            while len(self._compiled) > BANK_SHAPES_PER_BANK:
+                self._compiled.popitem(last=False)
+        self._compiled.move_to_end(frame_shape)
+        return compiled
+
+    @property
+    def nbytes(self):
+        """보관 중인 스펙트럼 메모리 (바이트)"""
+        with self._lock:
+            return sum(spectra.nbytes for _, groups in self._compiled.values() for *_, spectra in groups)
+
+    def scores(self, gray):
+        """모든 템플릿에 대한 최고 점수 벡터 (self.filenames 순서)"""
+        return self.scores_and_locations(gray)[0]
+
+    def scores_and_locations(self, gray):
+        """
+        모든 템플릿의 최고 점수와 그 위치를 반환합니다.
+        반환값: (scores[N], locations[N, 2]) - 위치는 (x, y) 좌상단 좌표
+        """
+        # 여러 ROI 스레드가 같은 캐릭터 뱅크를 동시에 쓸 수 있으므로 컴파일은 잠금 안에서 수행
+        with self._lock:
+            dft_shape, groups = self._get_compiled(gray.shape)
+
+        result = np.zeros(len(self.filenames), dtype=np.float64)
+        locations = np.zeros((len(self.filenames), 2), dtype=np.int64)
+        if not groups:
+            return result, locations
+
+        frame = gray.astype(np.float32)
+        frame_spectrum = np.fft.rfft2(frame, s=dft_shape).astype(np.complex64, copy=False)
+        integral, sq_integral = cv2.integral2(gray, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+
+        for indices, h, w, norms, spectra in groups:
+            out_h = gray.shape[0] - h + 1
+            out_w = gray.shape[1] - w + 1
+
+            # 분자: 프레임 x (평균 제거 템플릿) 상호상관, 템플릿 전체를 한 번에 역변환
+            num = np.fft.irfft2(spectra * frame_spectrum, s=dft_shape, axes=(-2, -1))
+            num = num[:, :out_h, :out_w]
+
+            # 분모: 창 분산 (모든 템플릿이 공유)
+            wnd_sum = _window_sums(integral, h, w)
+            wnd_sq = _window_sums(sq_integral, h, w)
+            wnd_var = np.sqrt(np.maximum(wnd_sq - wnd_sum * wnd_sum / (h * w), 0.0)).astype(np.float32)
+
+            denom = wnd_var[None, :, :] * norms.astype(np.float32)[:, None, None]
+
+            # OpenCV와 동일한 경계 처리 (분모가 0에 가까운 경우)
+            abs_num = np.abs(num)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                normed = np.where(abs_num < denom, num / denom, 0.0)
+            normed = np.where((abs_num >= denom) & (abs_num < denom * 1.125), np.sign(num), normed)
+
+            flat = normed.reshape(len(indices), -1)
+            best_idx = flat.argmax(axis=1)
+            best = flat[np.arange(len(indices)), best_idx]
+            best[norms < np.finfo(np.float64).eps] = 1.0
+            result[indices] = best
+            locations[indices, 0] = best_idx % out_w
+            locations[indices, 1] = best_idx // out_w
+
+        return result, locations
+
+    def best_match(self, gray):
+        """
+        기존 루프와 같은 규칙으로 최고 점수 템플릿을 반환합니다.
+        반환값: (filename, score, (x, y)), 모든 점수가 0 이하면 ("", 0, None)
+        """
+        scores, locations = self.scores_and_locations(gray)
+        if len(scores) == 0:
+            return "", 0, None
+        idx = int(np.argmax(scores >= scores.max() - SCORE_TIE_EPSILON))
+        if scores[idx] <= 0:
+            return "", 0, None
+        return self.filenames[idx], float(scores[idx]), (int(locations[idx, 0]), int(locations[idx, 1]))
+
+class BatchSkillMatcher:
+    """
+    캐릭터별 SkillTemplateBank를 LRU로 보관합니다.
+    보관 중인 스펙트럼 합이 max_bytes를 넘으면 오래 쓰지 않은 뱅크부터 해제합니다.
+    (방금 요청한 뱅크는 상한보다 커도 유지, 스펙트럼은 첫 매칭 때 만들어지므로 다음 요청 시 반영)
+    """
+    def __init__(self, max_bytes=SKILL_BANK_MEMORY_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._banks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def resident_bytes(self):
+        with self._lock:
+            return sum(bank.nbytes for bank in self._banks.values())
+
+    def get_bank(self, char_name, templates):
+        with self._lock:
+            bank = self._banks.get(char_name)
+            # 템플릿 세트가 교체되었으면 (해상도 변경 등) 새로 생성
+            if bank is None or bank.templates is not templates:
+                bank = SkillTemplateBank(templates)
+                self._banks[char_name] = bank
+            self._banks.move_to_end(char_name)
+
+            total = sum(b.nbytes for b in self._banks.values())
+            while total > self.max_bytes and len(self._banks) > 1:
+                _, evicted = self._banks.popitem(last=False)
+                total -= evicted.nbytes
+
+            return bank
+
+    def best_match(self, char_name, templates, gray):
+        return self.get_bank(char_name, templates).best_match(gray)
+
+def coarse_to_fine_face(gray, face_templates, coarse_faces, levels=PYRAMID_LEVELS, top_k=PYRAMID_TOP_K,
+                        buffers=None):
+    """
+    얼굴 coarse-to-fine 탐색.
+    축소 프레임에서 모든 얼굴을 점수화해 상위 top_k 후보만 고르고,
+    원본 해상도에서는 축소 매칭 위치 주변의 작은 창만 다시 매칭합니다.
+    반환값: (char_name, diff, (x, y)) - 후보가 없으면 (None, 1.0, None)
+    """
+    coarse_gray = pyramid_down(gray, levels, buffers)
+
+    ranked = []
+    for order, (char_name, (img, mask)) in enumerate(coarse_faces.items()):
+        if not _fits(coarse_gray, img):
+            continue
+        res = match_template(coarse_gray, img, cv2.TM_SQDIFF_NORMED, mask, buffers, "coarse_face")
+        min_val, _, min_loc, _ = cv2.minMaxLoc(res)
+        ranked.append((min_val, order, char_name, min_loc))
+
+    # 동점 처리를 전체 탐색과 맞추기 위해 후보는 원래 순서대로 재평가
+    candidates = sorted(sorted(ranked)[:top_k], key=lambda c: c[1])
+    factor = 2 ** levels
+
+    detected_char, best_diff, best_loc = None, 1.0, None
+    for _, _, char_name, (cx, cy) in candidates:
+        face_img, face_mask = face_templates[char_name]
+        window, (x0, y0) = crop_search_window(gray, (cx * factor, cy * factor), face_img.shape, margin=factor * 2)
+        if not _fits(window, face_img):
+            continue
+        res = match_template(window, face_img, cv2.TM_SQDIFF_NORMED, face_mask, buffers, "face")
+        min_val, _, min_loc, _ = cv2.minMaxLoc(res)
+        if min_val < best_diff:
+            detected_char, best_diff = char_name, min_val
+            best_loc = (x0 + min_loc[0], y0 + min_loc[1])
+
+    return detected_char, best_diff, best_loc
+
+def coarse_to_fine_skill(gray, templates, coarse_bank, levels=PYRAMID_LEVELS, top_k=PYRAMID_TOP_K, buffers=None):
+    """
+    스킬 coarse-to-fine 탐색.
+    축소 템플릿 뱅크로 전체 후보를 한 번에 점수화해 상위 top_k만 원본 해상도에서 재확인합니다.
+    반환값: (filename, score, (x, y)) - 후보가 없으면 ("", 0, None)
+    """
+    coarse_gray = pyramid_down(gray, levels, buffers)
+    scores, locations = coarse_bank.scores_and_locations(coarse_gray)
+    if len(scores) == 0:
+        return "", 0, None
+
+    # 동점 처리를 전체 탐색과 맞추기 위해 후보는 원래 순서대로 재평가
+    candidates = np.sort(np.argsort(-scores, kind='stable')[:top_k])
+    factor = 2 ** levels
+
+    best_filename, best_score, best_loc = "", 0, None
+    for idx in candidates:
+        filename = coarse_bank.filenames[idx]
+        skill_img = templates[filename]
+        loc = (int(locations[idx, 0]) * factor, int(locations[idx, 1]) * factor)
+        window, (x0, y0) = crop_search_window(gray, loc, skill_img.shape, margin=factor * 2)
+        if not _fits(window, skill_img):
+            continue
+        res = match_template(window, skill_img, cv2.TM_CCOEFF_NORMED, None, buffers, "skill")
+        _, max_val, _, max_loc = cv2.minMaxLoc(res)
+        if max_val > best_score + SCORE_TIE_EPSILON:
+            best_filename, best_score = filename, max_val
+            best_loc = (x0 + max_loc[0], y0 + max_loc[1])
+
+    return best_filename, best_score, best_loc
+
+class FaceIndex:
+    """
+    얼굴 식별용 사전 필터 (로드 시 한 번 생성).
+    원형 마스크 안의 픽셀을 size x size로 축소한 시그니처(평균 0, 길이 1로 정규화)를 한 행렬에 모아 두고,
+    ROI 프레임의 모든 위치 패치와 행렬곱 한 번으로 상관도를 구해 상위 top_k 캐릭터만 남깁니다.
+    정밀 판정은 남은 후보에 대해서만 masked matchTemplate으로 수행합니다.
+    (얼굴 템플릿은 모두 같은 크기라고 가정)
+    """
+    def __init__(self, face_templates, size=FACE_INDEX_SIZE, top_k=FACE_INDEX_TOP_K):
+        self.size = size
+        self.top_k = top_k
+        self.names = list(face_templates)
+        self.order = {char_name: i for i, char_name in enumerate(self.names)}
+        self.mask = create_mask(size, size).ravel() > 0
+
+        signatures = [
+            cv2.resize(np.ascontiguousarray(img), (size, size), interpolation=cv2.INTER_AREA).ravel()[self.mask]
+            for img, _ in face_templates.values()
+        ]
+        self.matrix = self._normalize(np.stack(signatures)) if signatures else None
+
+    @staticmethod
+    def _normalize(rows):
+        rows = rows.astype(np.float32)
+        rows -= rows.mean(axis=-1, keepdims=True)
+        norm = np.linalg.norm(rows, axis=-1, keepdims=True)
+        return rows / np.maximum(norm, 1e-6)
+
+    def scores(self, gray, template_shape):
+        """
+        프레임을 템플릿 -> 시그니처 배율로 축소한 뒤 모든 위치의 패치와 상관도 계산.
+        반환값: 템플릿별 최대 상관도 (len(names),)
+        """
+        th, tw = template_shape[:2]
+        new_w = max(self.size, int(round(gray.shape[1] * self.size / tw)))
+        new_h = max(self.size, int(round(gray.shape[0] * self.size / th)))
+        small = cv2.resize(gray, (new_w, new_h), interpolation=cv2.INTER_AREA)
+
+        patches = sliding_window_view(small, (self.size, self.size)).reshape(-1, self.size * self.size)
+        patches = self._normalize(patches[:, self.mask])
+        return (patches @ self.matrix.T).max(axis=0)
+
+    def shortlist(self, gray, face_templates):
+        """
+        face_templates(스케일된 후보 세트) 중 상관도 상위 top_k만 남긴 dict 반환
+        (원래 순서를 유지해 동점 처리가 전체 탐색과 같도록)
+        """
+        indexed = [char_name for char_name in face_templates if char_name in self.order]
+        if self.matrix is None or len(indexed) <= self.top_k:
+            return face_templates
+
+        sample = face_templates[indexed[0]][0]
+        if not _fits(gray, sample):
+            return face_templates
+
+        scores = self.scores(gray, sample.shape)
+        ranked = sorted(indexed, key=lambda char_name: -scores[self.order[char_name]])
+        keep = set(ranked[:self.top_k])
+        return {
+            char_name: value for char_name, value in face_templates.items()
+            if char_name in keep or char_name not in self.order
+        }
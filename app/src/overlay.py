@@ -1,25 +1,60 @@
 import ctypes
 from PyQt5.QtWidgets import QWidget, QApplication
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QPainter, QPen, QColor, QFont
+from PyQt5.QtCore import Qt, QRect, QRectF
+from PyQt5.QtGui import QPainter, QPen, QColor, QFont, QPixmap
 
 # 설정 임포트
-from config import ROIS, FACE_OFFSET
+from config import ROIS, FACE_OFFSET, OVERLAY_MARGIN
 from src.load_resolution import get_capture_area
+from src.profiler import format_stats
+
+# [설정] 5단계 등급별 표시 (색상, 문구) - 0: 미지정 (표시 안 함)
+PRIORITY_STYLES = {
+    5: ((255, 140, 0), "★ Lv.6 ESSENTIAL ★"),   # 6레벨 필수 -> 주황색/골드
+    4: ((255, 20, 147), "Lv.6 RECOMMEND"),       # 6레벨 권장 -> 핑크/자주색
+    3: ((0, 255, 255), "★ Lv.1 ESSENTIAL ★"),   # 1레벨 필수 -> 하늘색/Cyan
+    2: ((50, 205, 50), "Lv.1 RECOMMEND"),        # 1레벨 권장 -> 초록색
+    1: ((220, 220, 220), "WAIT / LATER"),        # 후순위 -> 흰색/회색
+}
+BADGE_SIZE = (160, 30)
+DEBUG_LABEL_HEIGHT = 40
+STATS_WIDTH = 290
+# 디버그 텍스트 픽스맵 캐시 상한 (점수가 바뀔 때마다 새 항목이 생기므로 넘치면 비움)
+DEBUG_PIXMAP_CACHE_SIZE = 128
 
 class OverlayWindow(QWidget):
+    """
+    인식 결과 오버레이 (유지 모드 렌더링)
+    - 창 크기는 게임 클라이언트 영역 + 여백이며, geo가 바뀌면 게임 창을 따라 이동
+    - 표시 영역은 오버레이 기준 물리 픽셀 좌표로 geo가 바뀔 때만 한 번 계산
+      (Qt 고DPI 배율이 켜져 있으면 그릴 때 배율만큼 축소)
+    - 등급 배지/디버그 텍스트/성능 표는 미리 픽스맵으로 그려 두고 붙여넣기만 함
+    - 결과가 바뀐 ROI 영역만 update(rect)로 다시 그림
+    """
     def __init__(self):
         super().__init__()
-        self.matches = {}
+        # ROI별 표시 상태 (워커의 TickResult.rois)
+        self.rois = ()
         self.is_visible = True
-        
-        self.debug_info = {}
-        self.face_debug_info = {}
+
         self.debug_mode = False
+        self.stats = None
+        self.stats_pixmap = None
 
         # [최적화] 게임 창 위치 정보를 캐싱할 변수
-        self.cached_geo = None 
-        
+        self.cached_geo = None
+        # 게임 창이 있는 모니터의 Qt 배율 (물리 픽셀 / Qt 논리 좌표)
+        self.pixel_ratio = 1.0
+        # ROI별 표시 영역 (cached_geo 기준, _build_layout)
+        self.roi_layout = []
+
+        self.label_font = QFont("Arial", 11, QFont.Bold)
+        self.debug_font = QFont("Arial", 9, QFont.Bold)
+        self.stats_font = QFont("Consolas", 9)
+        self.badge_pixmaps = {priority: self._render_badge(color, text)
+                              for priority, (color, text) in PRIORITY_STYLES.items()}
+        self.debug_pixmaps = {}
+
         # 윈도우 설정 (투명, 클릭 통과, 최상위)
         self.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint | Qt.Tool)
         self.setAttribute(Qt.WA_TranslucentBackground)
@@ -33,164 +68,217 @@ class OverlayWindow(QWidget):
         style = ctypes.windll.user32.GetWindowLongW(int(hwnd), GWL_EXSTYLE)
         ctypes.windll.user32.SetWindowLongW(int(hwnd), GWL_EXSTYLE, style | WS_EX_LAYERED | WS_EX_TRANSPARENT)
 
-        screen_rect = QApplication.desktop().screenGeometry()
-        self.setGeometry(0, 0, screen_rect.width(), screen_rect.height())
+        # 게임 창 위치를 받기 전까지는 최소 크기 (update_result에서 게임 창에 맞춤)
+        self.setGeometry(0, 0, 1, 1)
+
+    # -----------------------------------------------------------
+    # 픽스맵 미리 그리기
+    # -----------------------------------------------------------
+    @staticmethod
+    def _new_pixmap(w, h):
+        pixmap = QPixmap(w, h)
+        pixmap.fill(Qt.transparent)
+        return pixmap
+
+    def _render_badge(self, color, text):
+        """등급 배지 (반투명 배경 + 등급 문구)"""
+        w, h = BADGE_SIZE
+        pixmap = self._new_pixmap(w, h)
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.fillRect(0, 0, w, h, QColor(0, 0, 0, 180))
+        painter.setFont(self.label_font)
+        painter.setPen(QColor(*color))
+        painter.drawText(10, h - 12, text)
+        painter.end()
+        return pixmap
+
+    def _debug_pixmap(self, text, score, width, color):
+        """디버그 텍스트 박스 (이름 + 점수), 같은 내용은 캐시에서 재사용"""
+        key = (text, score, width, color)
+        pixmap = self.debug_pixmaps.get(key)
+        if pixmap is not None:
+            return pixmap
+
+        if len(self.debug_pixmaps) >= DEBUG_PIXMAP_CACHE_SIZE:
+            self.debug_pixmaps.clear()
+        pixmap = self._new_pixmap(width, DEBUG_LABEL_HEIGHT)
+        painter = QPainter(pixmap)
+        painter.fillRect(0, 0, width, DEBUG_LABEL_HEIGHT, QColor(0, 0, 0, 200))
+        painter.setPen(QColor(*color))
+        painter.setFont(self.debug_font)
+        painter.drawText(0, 0, width, DEBUG_LABEL_HEIGHT, Qt.AlignCenter, f"{text}\n({score:.2f})")
+        painter.end()
+        self.debug_pixmaps[key] = pixmap
+        return pixmap
+
+    def _render_stats(self, stats):
+        text = format_stats(stats)
+        h = (text.count("\n") + 1) * 15 + 10
+        pixmap = self._new_pixmap(STATS_WIDTH, h)
+        painter = QPainter(pixmap)
+        painter.fillRect(0, 0, STATS_WIDTH, h, QColor(0, 0, 0, 200))
+        painter.setPen(QColor(180, 255, 180))
+        painter.setFont(self.stats_font)
+        painter.drawText(8, 5, STATS_WIDTH - 16, h - 10, Qt.AlignLeft | Qt.AlignTop, text)
+        painter.end()
+        return pixmap
+
+    # -----------------------------------------------------------
+    # 레이아웃 (geo가 바뀔 때만 계산)
+    # -----------------------------------------------------------
+    def _build_layout(self, geo):
+        """ROI별 표시 영역 (오버레이 창 기준 물리 픽셀 좌표: 클라이언트 좌상단 = 여백 위치)"""
+        layout = []
+        if not geo:
+            return layout
+        geo = {"x": OVERLAY_MARGIN, "y": OVERLAY_MARGIN, "w": geo["w"], "h": geo["h"]}
+        for roi in ROIS:
+            face_area = get_capture_area(geo, roi, FACE_OFFSET)
+            card_area = get_capture_area(geo, roi, None)
+            face = QRect(face_area["left"], face_area["top"], face_area["width"], face_area["height"])
+            card = QRect(card_area["left"], card_area["top"], card_area["width"], card_area["height"])
+            rects = {
+                "face": face,
+                "card": card,
+                "face_label": QRect(face.left(), face.top() - DEBUG_LABEL_HEIGHT, face.width(), DEBUG_LABEL_HEIGHT),
+                "skill_label": QRect(card.left(), card.bottom() + 1 + 5, card.width(), DEBUG_LABEL_HEIGHT),
+                "badge": QRect(card.left(), card.top() - BADGE_SIZE[1], *BADGE_SIZE),
+            }
+            # ROI 하나를 다시 그릴 때 무효화할 영역 (점선 테두리 여유 포함)
+            bounds = QRect()
+            for rect in rects.values():
+                bounds = bounds.united(rect)
+            rects["bounds"] = bounds.adjusted(-2, -2, 2, 2)
+            layout.append(rects)
+        return layout
+
+    def _stats_rect(self):
+        if not self.cached_geo or self.stats_pixmap is None:
+            return QRect()
+        return QRect(OVERLAY_MARGIN + 10, OVERLAY_MARGIN + 10,
+                     self.stats_pixmap.width(), self.stats_pixmap.height())
+
+    @staticmethod
+    def _screen_at(x, y):
+        """물리 픽셀 좌표 (x, y)가 속한 모니터와 그 배율. 못 찾으면 (None, 1.0)"""
+        for screen in QApplication.screens():
+            ratio = screen.devicePixelRatio()
+            g = screen.geometry()
+            # Qt5 고DPI 배율 사용 시 화면 원점은 그대로, 크기만 논리 좌표로 줄어듦
+            if g.x() <= x < g.x() + g.width() * ratio and g.y() <= y < g.y() + g.height() * ratio:
+                return screen, ratio
+        return None, 1.0
+
+    def _fit_to_game(self, geo):
+        """게임 클라이언트 영역(물리 픽셀) + 여백에 맞춰 오버레이 창 이동/크기 변경"""
+        screen, ratio = self._screen_at(geo["x"] + geo["w"] // 2, geo["y"] + geo["h"] // 2)
+        self.pixel_ratio = ratio
+        left, top = geo["x"] - OVERLAY_MARGIN, geo["y"] - OVERLAY_MARGIN
+        width, height = geo["w"] + OVERLAY_MARGIN * 2, geo["h"] + OVERLAY_MARGIN * 2
+        if ratio != 1.0 and screen is not None:
+            origin = screen.geometry().topLeft()
+            left = origin.x() + (left - origin.x()) / ratio
+            top = origin.y() + (top - origin.y()) / ratio
+            width, height = width / ratio, height / ratio
+        self.setGeometry(QRectF(left, top, width, height).toAlignedRect())
 
-    # [NEW] Worker가 보내준 게임 위치 정보를 받아서 저장
-    def update_geometry(self, geo):
-        self.cached_geo = geo
-        self.repaint() # 위치가 업데이트되었으니 다시 그리기
+    def _to_widget(self, rect):
+        """표시 영역(물리 픽셀) -> 위젯 논리 좌표 (update 영역용)"""
+        if self.pixel_ratio == 1.0:
+            return rect
+        r = self.pixel_ratio
+        return QRectF(rect.x() / r, rect.y() / r, rect.width() / r, rect.height() / r).toAlignedRect()
+
+    def _to_layout(self, rect):
+        """위젯 논리 좌표 -> 표시 영역(물리 픽셀) (paintEvent의 다시 그릴 영역 비교용)"""
+        if self.pixel_ratio == 1.0:
+            return rect
+        r = self.pixel_ratio
+        return QRectF(rect.x() * r, rect.y() * r, rect.width() * r, rect.height() * r).toAlignedRect()
+
+    # -----------------------------------------------------------
+    # 상태 갱신
+    # -----------------------------------------------------------
+    def update_result(self, result):
+        """
+        워커의 틱 결과(TickResult) 반영. 틱당 최대 한 번 호출되며,
+        바뀐 ROI 영역만 다시 그리기를 예약합니다. (창 위치가 바뀌면 전체)
+        """
+        self.rois = result.rois
+        if result.geo_changed:
+            self.cached_geo = result.geo
+            self.roi_layout = self._build_layout(result.geo)
+            if result.geo:
+                self._fit_to_game(result.geo)
+            self.update()
+            return
+        for i in result.changed:
+            if i < len(self.roi_layout):
+                self.update(self._to_widget(self.roi_layout[i]["bounds"]))
 
     def set_visibility(self, visible):
         self.is_visible = visible
-        self.repaint()
+        self.update()
 
     def set_debug_mode(self, enabled):
         self.debug_mode = enabled
-        self.repaint()
-
-    def update_result(self, index, filename, score, matched, priority):
-        if matched:
-            self.matches[index] = (filename, score, priority)
-        else:
-            if index in self.matches:
-                del self.matches[index]
-        self.repaint()
-
-    def update_debug_info(self, index, text, score):
-        if text.startswith("[FACE]"):
-            real_name = text.replace("[FACE]", "")
-            self.face_debug_info[index] = (real_name, score)
-        else:
-            self.debug_info[index] = (text, score)
-
-    def clear_all(self):
-        self.matches.clear()
-        self.debug_info.clear()
-        self.face_debug_info.clear()
-        self.repaint()
+        self.stats_pixmap = None
+        self.update()
 
+    def update_stats(self, stats):
+        """워커의 단계별 소요 시간 통계 (디버그 모드에서만 표시)"""
+        self.stats = stats
+        if not (self.debug_mode and self.is_visible):
+            return
+        old_rect = self._stats_rect()
+        self.stats_pixmap = self._render_stats(stats)
+        self.update(self._to_widget(old_rect.united(self._stats_rect())))
+
+    # -----------------------------------------------------------
+    # 그리기
+    # -----------------------------------------------------------
     def paintEvent(self, event):
         if not self.is_visible: return
+        if not self.cached_geo: return
 
-        # [최적화] 매번 계산하지 않고, Worker가 알려준 cached_geo 사용
-        geo = self.cached_geo
-        if not geo: return 
-
+        dirty = self._to_layout(event.rect())
         painter = QPainter(self)
-        painter.setRenderHint(QPainter.Antialiasing)
+        if self.pixel_ratio != 1.0:
+            painter.scale(1.0 / self.pixel_ratio, 1.0 / self.pixel_ratio)
+
+        for rects, state in zip(self.roi_layout, self.rois):
+            if not dirty.intersects(rects["bounds"]):
+                continue
 
-        for i, roi in enumerate(ROIS):
-            # -----------------------------------------------------------
-            # [디버깅용] 인식 범위 박스
-            # -----------------------------------------------------------
             if self.debug_mode:
-                face_area = get_capture_area(geo, roi, FACE_OFFSET)
-                painter.setPen(QPen(QColor(255, 255, 0, 150), 1, Qt.DotLine))
+                # [디버깅용] 인식 범위 박스
                 painter.setBrush(Qt.NoBrush)
-                painter.drawRect(
-                    face_area["left"], face_area["top"], 
-                    face_area["width"], face_area["height"]
-                )
-
-                card_area = get_capture_area(geo, roi, None)
+                painter.setPen(QPen(QColor(255, 255, 0, 150), 1, Qt.DotLine))
+                painter.drawRect(rects["face"])
                 painter.setPen(QPen(QColor(255, 255, 255, 80), 1, Qt.DotLine))
-                painter.drawRect(
-                    card_area["left"], card_area["top"],
-                    card_area["width"], card_area["height"]
-                )
-
-            # -------------------------------------------------------
-            # 1. 얼굴 디버그 정보
-            # -------------------------------------------------------
-            if self.debug_mode:
-                if i in self.face_debug_info:
-                    fname, score = self.face_debug_info[i]
-                    face_area = get_capture_area(geo, roi, FACE_OFFSET)
-                    fx, fy = face_area["left"], face_area["top"]
-                    fw = face_area["width"]
-                    text = f"{fname}\n({score:.2f})"
-
-                    painter.setBrush(QColor(0, 0, 0, 200))
-                    painter.setPen(Qt.NoPen)
-                    painter.drawRect(fx, fy - 40, fw, 40)
-
-                    painter.setPen(QColor(255, 255, 0))
-                    painter.setFont(QFont("Arial", 9, QFont.Bold))
-                    painter.drawText(fx, fy - 40, fw, 40, Qt.AlignCenter, text)
-                    
-            # -----------------------------------------------------------
-            # [디버깅용] 잠재력 디버그 표시
-            # -----------------------------------------------------------
-            if self.debug_mode and (i in self.debug_info):
-                card_area = get_capture_area(geo, roi, None)
-                x, y, w, h = card_area["left"], card_area["top"], card_area["width"], card_area["height"]
-                fname, score = self.debug_info[i]
-                debug_text = f"{fname}\n({score:.2f})"
-                
-                painter.setBrush(QColor(0, 0, 0, 200))
-                painter.setPen(Qt.NoPen)
-                painter.drawRect(x, y + h + 5, w, 40)
-
-                painter.setPen(QColor(0, 255, 255))
-                painter.setFont(QFont("Arial", 9, QFont.Bold))
-                painter.drawText(x, y + h + 5, w, 40, Qt.AlignCenter, debug_text)
-            
-            # -----------------------------------------------------------
-            # [결과 표시] 매칭된 카드 하이라이트
-            # -----------------------------------------------------------
-            if i in self.matches:
-                filename, score, priority = self.matches[i]
-                
-                # [설정] 5단계 등급 정의
-                if priority == 5:
-                    # [5] 6레벨 필수 -> 주황색/골드
-                    box_color = QColor(255, 140, 0) 
-                    line_width = 5
-                    label_text = "★ Lv.6 ESSENTIAL ★"
-                    
-                elif priority == 4:
-                    # [4] 6레벨 권장 -> 핑크/자주색
-                    box_color = QColor(255, 20, 147) 
-                    line_width = 4
-                    label_text = "Lv.6 RECOMMEND"
-                    
-                elif priority == 3:
-                    # [3] 1레벨 필수 -> 하늘색/Cyan
-                    box_color = QColor(0, 255, 255)
-                    line_width = 4
-                    label_text = "★ Lv.1 ESSENTIAL ★"
-                    
-                elif priority == 2:
-                    # [2] 1레벨 권장 -> 초록색
-                    box_color = QColor(50, 205, 50) 
-                    line_width = 3
-                    label_text = "Lv.1 RECOMMEND"
-
-                elif priority == 1:
-                    # [1] 후순위 -> 흰색/회색
-                    box_color = QColor(220, 220, 220) 
-                    line_width = 2
-                    label_text = "WAIT / LATER"
-                    
-                else:
-                    # 0: 미지정 (표시 안 함)
-                    box_color = QColor(0, 0, 0, 0)
-                    line_width = 0
-                    label_text = ""
-
-                # 텍스트 그리기
-                if label_text != "":
-                    # Worker에서 받은 캐시된 위치 정보 사용
-                    card_area = get_capture_area(geo, roi, None)
-                    abs_x, abs_y = card_area["left"], card_area["top"]
-
-                    painter.setBrush(QColor(0, 0, 0, 180))
-                    painter.setPen(Qt.NoPen)
-                    painter.drawRect(abs_x, abs_y - 30, 160, 30)
-
-                    painter.setFont(QFont("Arial", 11, QFont.Bold))
-                    painter.setPen(box_color)
-                    painter.drawText(abs_x + 10, abs_y - 12, label_text)
-
-                painter.setBrush(Qt.NoBrush)
\ No newline at end of file
+                painter.drawRect(rects["card"])
+
+                # 얼굴 / 잠재력 디버그 정보
+                if state.face is not None:
+                    label = rects["face_label"]
+                    painter.drawPixmap(label.topLeft(), self._debug_pixmap(*state.face, label.width(), (255, 255, 0)))
+                if state.skill is not None:
+                    label = rects["skill_label"]
+                    painter.drawPixmap(label.topLeft(), self._debug_pixmap(*state.skill, label.width(), (0, 255, 255)))
+
+            # [결과 표시] 매칭된 카드 등급 배지
+            if state.match is not None and state.match[2]:
+                badge = self.badge_pixmaps.get(state.match[3])
+                if badge is not None:
+                    painter.drawPixmap(rects["badge"].topLeft(), badge)
+
+        # [디버깅용] 단계별 소요 시간 (게임 클라이언트 좌상단)
+        if self.debug_mode and self.stats is not None:
+            if self.stats_pixmap is None:
+                self.stats_pixmap = self._render_stats(self.stats)
+            stats_rect = self._stats_rect()
+            if dirty.intersects(stats_rect):
+                painter.drawPixmap(stats_rect.topLeft(), self.stats_pixmap)
+
+        painter.end()
@@ -0,0 +1,119 @@
+import csv
+import json
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from config import PROFILE_WINDOW
+
+# 계측 단계 (표시 순서)
+# templates: 게임 해상도에 맞춘 템플릿 세트 조회 (프레임 리사이즈는 없음)
+STAGES = ("grab", "templates", "gray", "face", "skill", "emit", "tick")
+
+class StageProfiler:
+    """
+    단계별 최근 PROFILE_WINDOW개 소요 시간을 링 버퍼에 보관합니다.
+    기록(add)은 배열 한 칸 쓰기뿐이라 항상 켜 둘 수 있고,
+    백분위(p50/p95/p99)는 통계를 내보낼 때만 계산합니다.
+    ROI 스레드 풀에서도 호출되므로 잠금으로 보호합니다.
+    """
+    def __init__(self, window=PROFILE_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._samples = {stage: np.zeros(self.window) for stage in STAGES}
+            self._counts = {stage: 0 for stage in STAGES}
+            self._tick_stamps = deque(maxlen=self.window)
+
+    def add(self, stage, seconds):
+        with self._lock:
+            count = self._counts[stage]
+            self._samples[stage][count % self.window] = seconds
+            self._counts[stage] = count + 1
+
+    def mark_tick(self):
+        """스캔 틱 완료 시각 기록 (실제 스캔 주기 계산용)"""
+        with self._lock:
+            self._tick_stamps.append(time.perf_counter())
+
+    def _recent(self):
+        """단계별 최근 측정값 복사본 (ms, 오래된 순)"""
+        with self._lock:
+            recent = {}
+            for stage in STAGES:
+                count = self._counts[stage]
+                samples = self._samples[stage]
+                if count <= self.window:
+                    recent[stage] = samples[:count] * 1000
+                else:
+                    recent[stage] = np.roll(samples, -(count % self.window)) * 1000
+            counts = dict(self._counts)
+            stamps = list(self._tick_stamps)
+        return recent, counts, stamps
+
+    def snapshot(self):
+        """
+        반환값: {"scan_rate": 초당 스캔 횟수,
+                 "stages": {stage: {"count", "p50", "p95", "p99", "mean", "max"} (ms)}}
+        """
+        recent, counts, stamps = self._recent()
+
+        stages = {}
+        for stage in STAGES:
+            values = recent[stage]
+            if len(values) == 0:
+                continue
+            p50, p95, p99 = np.percentile(values, (50, 95, 99))
+            stages[stage] = {
+                "count": counts[stage],
+                "p50": round(float(p50), 3),
+                "p95": round(float(p95), 3),
+                "p99": round(float(p99), 3),
+                "mean": round(float(values.mean()), 3),
+                "max": round(float(values.max()), 3),
+            }
+
+        scan_rate = 0.0
+        if len(stamps) >= 2 and stamps[-1] > stamps[0]:
+            scan_rate = (len(stamps) - 1) / (stamps[-1] - stamps[0])
+
+        return {"scan_rate": round(scan_rate, 2), "stages": stages}
+
+    def dump(self, path):
+        """통계를 파일로 저장 (.csv면 단계별 표, 그 외에는 최근 측정값까지 포함한 JSON)"""
+        stats = self.snapshot()
+        if path.lower().endswith(".csv"):
+            with open(path, 'w', encoding='utf-8', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(["stage", "count", "p50_ms", "p95_ms", "p99_ms", "mean_ms", "max_ms"])
+                for stage, row in stats["stages"].items():
+                    writer.writerow([stage, row["count"], row["p50"], row["p95"], row["p99"], row["mean"], row["max"]])
+                writer.writerow(["scan_rate_hz", "", stats["scan_rate"], "", "", "", ""])
+        else:
+            recent, _, _ = self._recent()
+            stats["timestamp"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+            stats["samples_ms"] = {stage: [round(float(v), 3) for v in values] for stage, values in recent.items()}
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(stats, f, ensure_ascii=False, indent=2)
+
+def format_stats(stats, stages=STAGES):
+    """디버그 오버레이용 여러 줄 텍스트 (고정폭 글꼴 기준 정렬)"""
+    lines = [f"scan {stats['scan_rate']:5.1f} Hz    p50    p95    p99 ms"]
+    for stage in stages:
+        row = stats["stages"].get(stage)
+        if row is None:
+            continue
+        lines.append(f"{stage:<13}{row['p50']:>7.1f}{row['p95']:>7.1f}{row['p99']:>7.1f}")
+    return "\n".join(lines)
+
+def format_summary(stats):
+    """컨트롤 패널용 한 줄 요약"""
+    tick = stats["stages"].get("tick")
+    if tick is None:
+        return "성능: 측정 대기 중"
+    return f"스캔 {stats['scan_rate']:.1f} Hz | 틱 p50 {tick['p50']:.1f} / p95 {tick['p95']:.1f} / p99 {tick['p99']:.1f} ms"
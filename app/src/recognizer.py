@@ -0,0 +1,273 @@
+import time
+
+import cv2
+
+from config import (ROIS, FACE_MATCH_THRESHOLD, SKILL_MATCH_THRESHOLD, TRACKING_MODE,
+                    ANCHOR_MARGIN_RATIO, ANCHOR_RECORD_SCORE, BUILD_FIRST_SEARCH, BUILD_FACE_CONFIDENT_DIFF,
+                    BUILD_SKILL_CONFIDENT_SCORE)
+from src.load_build import BuildCandidates
+from src.capture import CapturePlan
+from src.matcher import (BatchSkillMatcher, coarse_to_fine_face, coarse_to_fine_skill, crop_search_window,
+                         SCORE_TIE_EPSILON)
+from src.tracker import RoiTrack, verify_face, verify_skill
+from src.profiler import StageProfiler
+from src.buffer_pool import BufferPool, to_gray, match_template
+
+class RoiRecognizer:
+    """
+    ROI 단위 얼굴 -> 스킬 인식 로직 (Qt/화면 캡처와 무관).
+    MatcherWorker의 실시간 루프, 리플레이, 벤치마크, 배치 인식 CLI가 함께 사용합니다.
+    - tracking=False: 직전 결과 재확인 없이 매번 탐색 (서로 독립적인 이미지 처리용)
+    - anchor_store=None: 아이콘 위치 학습 없이 카드 전체 탐색
+    """
+    def __init__(self, profiler=None, tracking=TRACKING_MODE, anchor_store=None):
+        self.profiler = profiler or StageProfiler()
+        self.tracking = tracking
+        self.anchor_store = anchor_store
+        self.build_loader = None
+        self.build_candidates = None
+        self.template_store = None
+        self.face_index = None
+        self.skill_matcher = BatchSkillMatcher()
+        self.coarse_skill_matcher = BatchSkillMatcher()
+        self.current_geo = None
+        self.tracks = [RoiTrack() for _ in ROIS]
+        # ROI별 작업 버퍼 (흑백 변환/매칭 결과 재사용, 스레드끼리 공유하지 않음)
+        self.buffers = [BufferPool() for _ in ROIS]
+
+    def set_build(self, build_loader):
+        """빌드 로더 교체 및 빌드 우선 탐색 후보 재구성"""
+        self.build_loader = build_loader
+        self.build_candidates = BuildCandidates(build_loader.target_map)
+
+    def reset_tracks(self):
+        for track in self.tracks:
+            track.reset()
+
+    def clear_buffers(self):
+        """게임 창 크기가 바뀌면 이전 크기의 작업 버퍼 해제"""
+        for buffers in self.buffers:
+            buffers.clear()
+
+    def recognize_frame(self, frame, geo, face_templates, skill_templates, coarse_templates=None):
+        """
+        게임 클라이언트 영역 이미지(BGRA) 한 장에서 모든 ROI를 인식합니다. (스크린샷 배치 처리용)
+        geo는 이미지 기준 좌표 (보통 x=y=0, w/h=이미지 크기)
+        반환값: ROI 순서대로 (recognize_roi 결과, 소요 시간 초) 목록
+        """
+        self.current_geo = geo
+        plan = CapturePlan(geo)
+        monitor = plan.monitor
+        union = frame[monitor["top"]:monitor["top"] + monitor["height"],
+                      monitor["left"]:monitor["left"] + monitor["width"]]
+
+        results = []
+        for i in range(len(ROIS)):
+            start = time.perf_counter()
+            result = self.recognize_roi(i, plan.face_view(union, i), plan.card_view(union, i),
+                                        face_templates, skill_templates, coarse_templates)
+            results.append((result, time.perf_counter() - start))
+        return results
+
+    def recognize_roi(self, index, face_frame, card_frame, face_templates, skill_templates, coarse_templates=None):
+        """
+        ROI 하나의 얼굴 -> 스킬 인식 수행 (시그널 전송 없음, 스레드 풀에서 호출 가능)
+        반환값: {"character": 인식된 캐릭터 | None, "face_debug": (text, score),
+                 "skill_debug": (text, score) | None,
+                 "match": (filename, score, matched, priority) | None,
+                 "pending": 스킬 템플릿 로드 대기 여부}
+        """
+        track = self.tracks[index]
+        buffers = self.buffers[index]
+        coarse_faces, coarse_skills = coarse_templates or (None, None)
+        result = {"character": None, "face_debug": None, "skill_debug": None, "match": None, "pending": False}
+
+        # 1단계: 얼굴 인식 시도
+        detected_char, diff = self.detect_face(face_frame, face_templates, track, coarse_faces, buffers)
+        result["face_debug"] = (f"[FACE]{detected_char}" if detected_char else "No Face", 1.0 - diff)
+
+        if detected_char and diff <= FACE_MATCH_THRESHOLD:
+            # 얼굴을 찾았으면 -> 2단계: 스킬 인식 시도
+            result["character"] = detected_char
+            if self.template_store is not None:
+                # 처음 보는 캐릭터면 로드 예약, 이미 있으면 LRU 갱신
+                self.template_store.request([detected_char], self.current_geo)
+
+            if detected_char not in skill_templates and self.template_store is not None \
+                    and self.template_store.has_character(detected_char):
+                # 스킬 템플릿 로딩 중: 스캔을 멈추지 않고 (?)로 표시
+                result["match"] = (f"{detected_char} (?)", 0.0, True, 0)
+                result["pending"] = True
+                return result
+
+            if detected_char not in skill_templates:
+                result["match"] = (f"{detected_char}", 1.0 - diff, True, 0)
+                return result
+
+            skill = self.detect_skill(card_frame, detected_char, skill_templates, track, index, coarse_skills, buffers)
+            if skill is not None:
+                result["skill_debug"], result["match"] = skill
+        else:
+            track.reset()
+            result["match"] = ("", 0.0, False, 0)
+
+        return result
+
+    def detect_face(self, frame, face_templates, track, coarse_faces=None, buffers=None):
+        """얼굴 인식 로직 (frame: 얼굴 영역 BGRA 뷰, buffers: ROI 작업 버퍼 풀)"""
+        if frame is None:
+            return None, 1.0
+
+        start = time.perf_counter()
+        gray = to_gray(frame, buffers, "face_gray")
+        converted = time.perf_counter()
+        result = self.match_face(gray, face_templates, track, coarse_faces, buffers)
+        self.profiler.add("gray", converted - start)
+        self.profiler.add("face", time.perf_counter() - converted)
+        return result
+
+    def match_face(self, gray, face_templates, track, coarse_faces=None, buffers=None):
+        """얼굴 매칭 (gray: 흑백 얼굴 영역). 반환값: (char_name, diff)"""
+        # [추적 모드] 직전 캐릭터만 직전 위치 주변에서 재확인
+        if self.tracking and track.char_name in face_templates:
+            face_img, face_mask = face_templates[track.char_name]
+            verified = verify_face(gray, track, face_img, face_mask, buffers)
+            if verified and verified[0] <= track.face_keep_limit():
+                track.set_face(track.char_name, verified[0], verified[1])
+                return track.char_name, verified[0]
+            track.reset()
+        
+        candidates = self.build_candidates
+        if BUILD_FIRST_SEARCH and candidates is not None:
+            # [빌드 우선] 빌드 캐릭터만 먼저 탐색하고, 확실하지 않을 때만 나머지 캐릭터 탐색
+            build_faces, rest_faces = candidates.split_faces(face_templates)
+            build_coarse, rest_coarse = candidates.split_faces(coarse_faces) if coarse_faces else (None, None)
+            detected_char, best_diff, best_loc = self.search_face(gray, build_faces, build_coarse, buffers)
+            if best_diff > BUILD_FACE_CONFIDENT_DIFF and rest_faces:
+                rest = self.search_face(gray, rest_faces, rest_coarse, buffers)
+                if rest[1] < best_diff:
+                    detected_char, best_diff, best_loc = rest
+        else:
+            detected_char, best_diff, best_loc = self.search_face(gray, face_templates, coarse_faces, buffers)
+
+        if self.tracking and detected_char and best_diff <= FACE_MATCH_THRESHOLD:
+            track.set_face(detected_char, best_diff, best_loc)
+                
+        return detected_char, best_diff
+
+    def search_face(self, gray, face_templates, coarse_faces=None, buffers=None):
+        """
+        gray 영역에서 얼굴 템플릿 전체를 탐색합니다.
+        반환값: (char_name, diff, (x, y)) - 후보가 없으면 (None, 1.0, None)
+        """
+        if self.face_index is not None:
+            # [사전 필터] 시그니처 상관도 상위 후보만 남기고 masked matchTemplate으로 정밀 판정
+            face_templates = self.face_index.shortlist(gray, face_templates)
+        elif coarse_faces:
+            # [Coarse-to-fine] 축소 프레임에서 후보를 고른 뒤 상위 후보만 정밀 매칭
+            return coarse_to_fine_face(gray, face_templates, coarse_faces, buffers=buffers)
+
+        detected_char = None
+        best_diff = 1.0
+        best_loc = None
+        for char_name, (face_img, face_mask) in face_templates.items():
+            res = match_template(gray, face_img, cv2.TM_SQDIFF_NORMED, face_mask, buffers, "face")
+            min_val, _, min_loc, _ = cv2.minMaxLoc(res)
+
+            if min_val < best_diff:
+                best_diff = min_val
+                best_loc = min_loc
+                detected_char = char_name
+
+        return detected_char, best_diff, best_loc
+
+    def detect_skill(self, frame, char_name, skill_templates, track, index, coarse_skills=None, buffers=None):
+        """
+        스킬 아이콘 인식 로직 (frame: 카드 영역 BGRA 뷰)
+        반환값: ((filename, score) 디버그 정보, match_signal 인자) 또는 None
+        """
+        if frame is None:
+            return None
+
+        start = time.perf_counter()
+        gray = to_gray(frame, buffers, "card_gray")
+        converted = time.perf_counter()
+        result = self.match_skill(gray, char_name, skill_templates[char_name], track, index, coarse_skills, buffers)
+        self.profiler.add("gray", converted - start)
+        self.profiler.add("skill", time.perf_counter() - converted)
+        return result
+
+    def match_skill(self, gray, char_name, templates, track, index, coarse_skills=None, buffers=None):
+        """스킬 매칭 (gray: 흑백 카드 영역, templates: 캐릭터 스킬 템플릿). 반환값은 detect_skill과 같음"""
+        verified = None
+        # [추적 모드] 직전 위치 주변에서 재확인 (같은 캐릭터의 다른 잠재력으로 바뀌었으면 전체 탐색)
+        if self.tracking and track.skill_file in templates:
+            verified = verify_skill(gray, track, templates, buffers)
+            if verified and not track.keeps_skill(verified[0], verified[2]):
+                verified = None
+                track.clear_skill()
+
+        if verified:
+            best_filename, best_score, best_loc = track.skill_file, verified[0], verified[1]
+        else:
+            best_filename, best_score, best_loc = "", 0, None
+
+            # [앵커] 학습된 아이콘 위치 주변의 작은 창만 탐색
+            anchor = self.anchor_store.get(self.current_geo, index) if self.anchor_store is not None and templates else None
+            if anchor:
+                sample = next(iter(templates.values()))
+                window, (x0, y0) = crop_search_window(gray, anchor, sample.shape, ANCHOR_MARGIN_RATIO)
+                best_filename, best_score, best_loc = self.search_skill(window, char_name, templates, coarse_skills, buffers)
+                if best_loc:
+                    best_loc = (x0 + best_loc[0], y0 + best_loc[1])
+
+            # 앵커가 없거나 점수가 무너지면 카드 전체 탐색 후 앵커 (재)학습
+            if best_score < SKILL_MATCH_THRESHOLD:
+                best_filename, best_score, best_loc = self.search_skill(gray, char_name, templates, coarse_skills, buffers)
+                if self.anchor_store is not None and best_loc and best_score >= ANCHOR_RECORD_SCORE:
+                    self.anchor_store.record(self.current_geo, index, best_loc)
+
+        debug = (best_filename, best_score)
+
+        if best_score >= SKILL_MATCH_THRESHOLD:
+            if self.tracking:
+                track.set_skill(best_filename, best_score, best_loc)
+            priority = self.build_loader.get_priority(char_name, best_filename)
+            return debug, (best_filename, best_score, True, priority)
+
+        track.clear_skill()
+        return debug, (f"{char_name} (?)", 0.0, True, 0)
+
+    def search_skill(self, gray, char_name, templates, coarse_skills=None, buffers=None):
+        """
+        gray 영역 전체에서 캐릭터의 스킬 템플릿을 탐색합니다.
+        반환값: (filename, score, (x, y))
+        """
+        coarse = coarse_skills.get(char_name) if coarse_skills else None
+
+        candidates = self.build_candidates
+        split = candidates.split_skills(char_name, templates, coarse) if BUILD_FIRST_SEARCH and candidates else None
+        if split is None:
+            return self.search_skill_set(gray, char_name, templates, coarse, buffers)
+
+        # [빌드 우선] 빌드 잠재력만 먼저 점수화하고, 애매할 때만 나머지 잠재력 탐색
+        (build_templates, build_coarse), (rest_templates, rest_coarse) = split
+        best = self.search_skill_set(gray, f"{char_name}:build", build_templates, build_coarse, buffers)
+        if best[1] >= BUILD_SKILL_CONFIDENT_SCORE or not rest_templates:
+            return best
+
+        rest = self.search_skill_set(gray, f"{char_name}:rest", rest_templates, rest_coarse, buffers)
+        return rest if rest[1] > best[1] + SCORE_TIE_EPSILON else best
+
+    def search_skill_set(self, gray, bank_key, templates, coarse=None, buffers=None):
+        """
+        템플릿 세트 하나를 탐색 (bank_key: 배치 매칭 뱅크 캐시 키)
+        buffers는 축소/정밀 매칭 결과에만 쓰이고, FFT 배치 점수 계산은 호출마다 임시 배열을 할당합니다.
+        """
+        if coarse:
+            # [Coarse-to-fine] 축소 템플릿 뱅크로 후보를 고른 뒤 상위 후보만 정밀 매칭
+            coarse_bank = self.coarse_skill_matcher.get_bank(bank_key, coarse)
+            return coarse_to_fine_skill(gray, templates, coarse_bank, buffers=buffers)
+
+        # 스킬 템플릿 전체를 한 번의 배치 연산으로 점수화
+        return self.skill_matcher.best_match(bank_key, templates, gray)
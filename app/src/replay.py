@@ -0,0 +1,233 @@
+import argparse
+import contextlib
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from config import DEFAULT_BUILD_FILE, BUILDS_FOLDER
+
+# =========================================================
+# 세션 파일 형식 (폴더 하나)
+# session.json : {"version", "created"}
+# index.jsonl  : 틱마다 한 줄 {"t": 녹화 시작 후 초, "geo": {...}, "offset", "size"}
+# frames.bin   : 캡처 프레임(BGRA)을 PNG로 인코딩해 이어 붙인 블롭
+#                직전과 같은 프레임은 다시 쓰지 않고 같은 offset을 가리킴
+# =========================================================
+SESSION_VERSION = 1
+SESSION_HEADER_FILE = "session.json"
+SESSION_INDEX_FILE = "index.jsonl"
+SESSION_FRAMES_FILE = "frames.bin"
+
+class SessionRecorder:
+    """
+    캡처 프레임과 geo, 타임스탬프를 세션 폴더에 녹화합니다.
+    PNG 인코딩과 파일 쓰기는 전용 스레드에서 처리해 스캔 루프를 막지 않습니다.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.frame_count = 0
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, SESSION_HEADER_FILE), 'w', encoding='utf-8') as f:
+            json.dump({"version": SESSION_VERSION, "created": time.strftime("%Y-%m-%d %H:%M:%S")}, f)
+
+        self._start = time.perf_counter()
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._write_loop, name="SessionRecorder", daemon=True)
+        self._thread.start()
+
+    def record(self, geo, frame):
+        """프레임 한 장 녹화 예약 (캡처 버퍼가 재사용될 수 있으므로 복사해서 넘김)"""
+        self.frame_count += 1
+        self._queue.put((time.perf_counter() - self._start, dict(geo), frame.copy()))
+
+    def _write_loop(self):
+        prev_frame, prev_ref = None, None
+        offset = 0
+        with open(os.path.join(self.path, SESSION_FRAMES_FILE), 'wb') as frames_file, \
+             open(os.path.join(self.path, SESSION_INDEX_FILE), 'w', encoding='utf-8') as index_file:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                t, geo, frame = item
+
+                if prev_frame is None or prev_frame.shape != frame.shape or not np.array_equal(prev_frame, frame):
+                    ok, encoded = cv2.imencode(".png", frame)
+                    if not ok:
+                        continue
+                    frames_file.write(encoded.tobytes())
+                    prev_frame, prev_ref = frame, (offset, len(encoded))
+                    offset += len(encoded)
+
+                index_file.write(json.dumps({"t": round(t, 4), "geo": geo, "offset": prev_ref[0], "size": prev_ref[1]}) + "\n")
+
+    def close(self):
+        """남은 프레임을 모두 쓴 뒤 종료"""
+        self._queue.put(None)
+        self._thread.join()
+
+class SessionReader:
+    """녹화된 세션을 틱 순서대로 읽습니다."""
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, SESSION_HEADER_FILE), 'r', encoding='utf-8') as f:
+            header = json.load(f)
+        if header.get("version") != SESSION_VERSION:
+            raise ValueError(f"지원하지 않는 세션 버전입니다: {header.get('version')}")
+
+        with open(os.path.join(path, SESSION_INDEX_FILE), 'r', encoding='utf-8') as f:
+            self.entries = [json.loads(line) for line in f if line.strip()]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def geometries(self):
+        """세션에 등장하는 서로 다른 창 크기별 geo 하나씩"""
+        sizes = {}
+        for entry in self.entries:
+            geo = entry["geo"]
+            sizes.setdefault((geo["w"], geo["h"]), geo)
+        return list(sizes.values())
+
+    def __iter__(self):
+        """반환값: (t, geo, frame) - 같은 프레임은 한 번만 디코딩"""
+        cached_ref, cached_frame = None, None
+        with open(os.path.join(self.path, SESSION_FRAMES_FILE), 'rb') as f:
+            for entry in self.entries:
+                ref = (entry["offset"], entry["size"])
+                if ref != cached_ref:
+                    f.seek(entry["offset"])
+                    raw = np.frombuffer(f.read(entry["size"]), dtype=np.uint8)
+                    cached_ref, cached_frame = ref, cv2.imdecode(raw, cv2.IMREAD_UNCHANGED)
+                yield entry["t"], entry["geo"], cached_frame
+
+class ReplayFrameSource:
+    """mss 대신 CapturePlan.grab에 넘기는 프레임 소스: 지정된 녹화 프레임을 그대로 돌려줌"""
+    def __init__(self):
+        self.frame = None
+
+    def grab(self, monitor):
+        if self.frame is None:
+            raise RuntimeError("재생할 프레임이 없습니다.")
+        if self.frame.shape[:2] != (monitor["height"], monitor["width"]):
+            # 녹화 이후 ROI 설정이 바뀌면 슬라이스 위치가 맞지 않음
+            raise ValueError(f"녹화 프레임 크기 {self.frame.shape[:2]}가 캡처 영역과 다릅니다: {monitor}")
+        return self.frame
+
+def percentile_ms(values, q):
+    return round(float(np.percentile(values, q)) * 1000, 3) if values else 0.0
+
+def replay_session(path, build_file, realtime=False):
+    """
+    녹화 세션을 MatcherWorker의 실제 인식 경로(scan_tick -> process_rois)로 재생합니다.
+    게임 창/mss/Win32 없이 헤드리스로 동작하며, 결과가 실행마다 같도록
+    - 세션에 나오는 해상도로 모든 캐릭터 스킬 템플릿을 미리 로드하고 (측정 제외)
+    - 앵커는 파일 대신 메모리에서만 학습합니다.
+    realtime=True면 녹화 당시 간격대로, False면 최대 속도로 재생합니다.
+    반환값: 처리량, 프레임별 지연 백분위, ROI별 매칭 변경 기록을 담은 dict
+    """
+    from src.worker import MatcherWorker
+    from src.window_tracker import FakeGeometryProvider
+    from src.anchor import AnchorStore
+
+    reader = SessionReader(path)
+
+    worker = MatcherWorker(build_file, geometry_provider=FakeGeometryProvider())
+    worker.recognizer.anchor_store = AnchorStore(path=None)
+    template_cache = worker.load_resources()
+    if template_cache is None:
+        raise RuntimeError("템플릿 로드 실패")
+
+    worker.recognizer.template_store.max_bytes = float("inf")
+    for geo in reader.geometries():
+        worker.recognizer.template_store.preload(worker.recognizer.template_store.characters(), geo)
+    worker.configure_threads()
+
+    # 틱 결과에서 ROI별 매칭이 바뀐 시점만 기록 (라이브와 같은 전송 규칙)
+    matches = []
+    frame_index = [0]
+
+    def on_result(result):
+        for i in sorted(result.changed):
+            match = result.rois[i].match
+            if match is not None and last_match.get(i) != match:
+                matches.append([frame_index[0], i, *match])
+            last_match[i] = match
+
+    last_match = {}
+    worker.result_signal.connect(on_result)
+
+    source = ReplayFrameSource()
+    latencies = []
+    prev_geo = None
+    start = time.perf_counter()
+
+    for i, (t, geo, frame) in enumerate(reader):
+        if realtime:
+            delay = t - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+
+        frame_index[0] = i
+        source.frame = frame
+        tick_start = time.perf_counter()
+        if geo != prev_geo:
+            worker.results.set_geometry(geo)
+            worker.request_build_templates(geo)
+            prev_geo = geo
+        worker.scan_tick(source, geo, template_cache)
+        worker.publish()
+        latencies.append(time.perf_counter() - tick_start)
+        worker.profiler.add("tick", latencies[-1])
+        worker.profiler.mark_tick()
+
+    elapsed = time.perf_counter() - start
+    worker.recognizer.template_store.shutdown()
+    if worker.executor is not None:
+        worker.executor.shutdown(wait=True)
+
+    return {
+        "session": path,
+        "build": build_file,
+        "mode": "realtime" if realtime else "max",
+        "frames": len(latencies),
+        "elapsed_s": round(elapsed, 3),
+        "fps": round(len(latencies) / elapsed, 2) if elapsed > 0 else 0.0,
+        "latency_ms": {
+            "p50": percentile_ms(latencies, 50),
+            "p95": percentile_ms(latencies, 95),
+            "p99": percentile_ms(latencies, 99),
+            "max": round(max(latencies) * 1000, 3) if latencies else 0.0,
+        },
+        "stages": worker.profiler.snapshot()["stages"],
+        "matches": matches,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="녹화 세션 재생 (성능/정확도 비교용)")
+    parser.add_argument("session", help="녹화 세션 폴더")
+    parser.add_argument("--build", default=os.path.join(BUILDS_FOLDER, DEFAULT_BUILD_FILE), help="빌드 JSON 경로")
+    parser.add_argument("--realtime", action="store_true", help="녹화 당시 간격대로 재생 (기본: 최대 속도)")
+    parser.add_argument("--output", help="결과 JSON 저장 경로 (생략 시 표준 출력)")
+    args = parser.parse_args(argv)
+
+    # 로딩 로그가 표준 출력의 JSON 결과와 섞이지 않도록 stderr로 보냄
+    with contextlib.redirect_stdout(sys.stderr):
+        report = replay_session(args.session, args.build, args.realtime)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+        print(f"[리플레이] {report['frames']}프레임, {report['fps']} fps, "
+              f"p95 {report['latency_ms']['p95']} ms -> {args.output}")
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import threading
+import time
+
+from config import SCAN_FRAME_BUDGET, SCAN_BACKOFF_MIN, SCAN_BACKOFF_MAX
+
+class ScanScheduler:
+    """
+    고정 sleep 대신 목표 프레임 예산(SCAN_FRAME_BUDGET)에 맞춰 다음 스캔 시점을 정합니다.
+    - 실행 중: 예산에서 실제 작업 시간을 뺀 만큼만 대기
+    - 게임 없음/최소화/비활성: 같은 상태가 이어질수록 대기 시간을 지수적으로 늘림
+    - 일시정지/종료/빌드 변경: notify()로 대기 중인 워커를 즉시 깨움
+    """
+    def __init__(self, frame_budget=SCAN_FRAME_BUDGET, backoff_min=SCAN_BACKOFF_MIN, backoff_max=SCAN_BACKOFF_MAX):
+        self.frame_budget = frame_budget
+        self.backoff_min = backoff_min
+        self.backoff_max = backoff_max
+
+        self._wake = threading.Event()
+        self._tick_start = time.perf_counter()
+        self._idle_state = None
+        self._idle_delay = backoff_min
+
+        self.last_work_time = 0.0
+
+    def begin_tick(self):
+        """틱 작업 시작 시점 기록"""
+        self._tick_start = time.perf_counter()
+
+    def _elapsed(self):
+        return time.perf_counter() - self._tick_start
+
+    def wait_active(self):
+        """정상 스캔 후 대기: 백오프를 초기화하고 남은 프레임 예산만큼 대기"""
+        self._idle_state = None
+        self._idle_delay = self.backoff_min
+        self.last_work_time = self._elapsed()
+        self.sleep(max(0.0, self.frame_budget - self.last_work_time))
+
+    def wait_idle(self, state):
+        """
+        게임을 스캔할 수 없는 상태에서 대기합니다.
+        상태가 바뀌면 최소 대기부터 다시 시작하고, 같은 상태가 이어지면 두 배씩 늘립니다.
+        """
+        if state != self._idle_state:
+            self._idle_state = state
+            self._idle_delay = self.backoff_min
+        else:
+            self._idle_delay = min(self._idle_delay * 2, self.backoff_max)
+
+        self.last_work_time = self._elapsed()
+        self.sleep(max(0.0, self._idle_delay - self.last_work_time))
+
+    def sleep(self, timeout=None):
+        """timeout 동안(None이면 notify까지) 대기. notify되면 즉시 반환"""
+        self._wake.wait(timeout)
+        self._wake.clear()
+
+    def notify(self):
+        """대기 중인 워커를 즉시 깨웁니다. (스레드 안전)"""
+        self._wake.set()
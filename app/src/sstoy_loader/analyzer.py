@@ -1,6 +1,6 @@
-import requests
 import json
 import decoder
+from game_data import default_cache, GameDataError
 
 # === 설정: GitHub Raw Data URL ===
 REPO_BASE_URL = "https://raw.githubusercontent.com/JforPlay/sstoy/refs/heads/main/public/data"
@@ -9,13 +9,10 @@ POTENTIAL_DB_URL = f"{REPO_BASE_URL}/Potential.json"
 CHAR_NAME_DB_URL = f"{REPO_BASE_URL}/EN/Character.json"
 
 def fetch_db(url, name):
-    print(f"📥 {name} DB 다운로드 중...")
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        print(f"❌ {name} 다운로드 실패: {e}")
+        return default_cache().get(url, name)
+    except GameDataError as e:
+        print(f"❌ {e}")
         return None
 
 def build_id_mapping(db_json):
@@ -2,8 +2,8 @@ import sys
 import os
 import json
 import re
-import requests
 from . import decoder
+from .game_data import default_cache
 
 try:
     from config import CHARACTER_DB_URL, POTENTIAL_DB_URL, CHAR_NAME_DB_URL, BUILDS_FOLDER
@@ -35,14 +35,25 @@ class ConverterWorker(QThread):
         super().__init__()
         self.url = url
 
-    def fetch_db(self, url, name):
-        self.log_signal.emit(f"📥 {name} 데이터 다운로드 중...")
-        try:
-            response = requests.get(url)
-            response.raise_for_status()
-            return response.json()
-        except Exception as e:
-            raise Exception(f"{name} 다운로드 실패: {e}")
+    def fetch_dbs(self):
+        """
+        세 DB를 하나의 세션으로 동시에 받습니다. (진행률 10 -> 70)
+        디스크 캐시 사용 (TTL 안이면 다운로드 없음, 네트워크 오류 시 이전 캐시)
+        캐시도 없으면 GameDataError -> run()에서 실패로 보고
+        """
+        last = [10]
+
+        def on_progress(fraction):
+            value = 10 + int(60 * fraction)
+            if value != last[0]:
+                last[0] = value
+                self.progress_signal.emit(value)
+
+        return default_cache().get_many([
+            (CHARACTER_DB_URL, "Character"),
+            (POTENTIAL_DB_URL, "Potential"),
+            (CHAR_NAME_DB_URL, "Character Name (EN)"),
+        ], log=self.log_signal.emit, progress=on_progress)
 
     def build_id_mapping(self, db_json):
         if not db_json: return []
@@ -69,14 +80,8 @@ class ConverterWorker(QThread):
         try:
             self.progress_signal.emit(10)
 
-            # 1. DB 다운로드
-            char_db = self.fetch_db(CHARACTER_DB_URL, "Character")
-            self.progress_signal.emit(30)
-            
-            pot_db = self.fetch_db(POTENTIAL_DB_URL, "Potential")
-            self.progress_signal.emit(50)
-            
-            name_db = self.fetch_db(CHAR_NAME_DB_URL, "Character Name (EN)")
+            # 1. DB 다운로드 (동시)
+            char_db, pot_db, name_db = self.fetch_dbs()
             self.progress_signal.emit(70)
 
             # 2. 매핑 테이블 생성
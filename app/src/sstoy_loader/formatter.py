@@ -1,8 +1,8 @@
 import json
-import requests
 import os
 import re
 import decoder
+from game_data import default_cache, GameDataError
 
 # === 설정 ===
 REPO_BASE_URL = "https://raw.githubusercontent.com/JforPlay/sstoy/refs/heads/main/public/data"
@@ -11,13 +11,10 @@ POTENTIAL_DB_URL = f"{REPO_BASE_URL}/Potential.json"
 CHAR_NAME_DB_URL = f"{REPO_BASE_URL}/EN/Character.json"
 
 def fetch_db(url, name):
-    print(f"📥 {name} 데이터 다운로드 중...")
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        print(f"❌ {name} 다운로드 실패: {e}")
+        return default_cache().get(url, name)
+    except GameDataError as e:
+        print(f"❌ {e}")
         return {}
 
 def build_id_mapping(db_json):
@@ -0,0 +1,220 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    from config import (GAME_DATA_CACHE_DIR, GAME_DATA_TTL, GAME_DATA_TIMEOUT, GAME_DATA_OFFLINE,
+                        GAME_DATA_RETRIES, GAME_DATA_BACKOFF, GAME_DATA_CHUNK_SIZE)
+    from src.file_utils import atomic_write
+except ImportError:
+    # 단독 실행 (analyzer.py / formatter.py 등)
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+    from config import (GAME_DATA_CACHE_DIR, GAME_DATA_TTL, GAME_DATA_TIMEOUT, GAME_DATA_OFFLINE,
+                        GAME_DATA_RETRIES, GAME_DATA_BACKOFF, GAME_DATA_CHUNK_SIZE)
+    from src.file_utils import atomic_write
+
+# =========================================================
+# SSToy 게임 DB 디스크 캐시
+# Character.json / Potential.json / EN/Character.json 을 URL별로 저장해 두고,
+# TTL 동안은 네트워크 없이 캐시를 쓰고, TTL이 지나면 ETag/Last-Modified 조건부 요청으로 재확인합니다.
+# 네트워크 오류/서버 오류 시에는 오래된 캐시라도 그대로 사용합니다.
+# =========================================================
+
+class GameDataError(Exception):
+    """다운로드에 실패했고 쓸 수 있는 캐시도 없음"""
+
+def make_session(retries=GAME_DATA_RETRIES, backoff=GAME_DATA_BACKOFF):
+    """
+    연결을 재사용하는 세션 (같은 호스트의 DB 여러 개를 동시에 받아도 풀에서 연결 공유).
+    연결 실패/읽기 타임아웃/5xx는 지수 백오프로 retries번까지 재시도합니다.
+    """
+    retry = Retry(
+        total=retries, backoff_factor=backoff,
+        status_forcelist=(429, 500, 502, 503, 504), allowed_methods=frozenset(["GET"]),
+        raise_on_status=False,  # 재시도 소진 시 마지막 응답을 그대로 반환 -> raise_for_status에서 처리
+    )
+    adapter = HTTPAdapter(max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+class GameDataCache:
+    """
+    cache_dir: 저장 폴더 (URL마다 <키>_<파일명> 본문 + .meta.json 메타데이터)
+    ttl: 마지막 확인 후 재확인 없이 캐시를 쓰는 시간(초). 0이면 매번 조건부 요청
+    offline: True면 요청 없이 캐시만 사용
+    session: requests.Session 호환 객체 (테스트에서 교체 가능)
+    """
+    def __init__(self, cache_dir=GAME_DATA_CACHE_DIR, ttl=GAME_DATA_TTL, offline=GAME_DATA_OFFLINE,
+                 session=None, timeout=GAME_DATA_TIMEOUT):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.offline = offline
+        self.session = session or make_session()
+        self.timeout = timeout
+        # url -> (meta, 파싱된 JSON). 같은 프로세스에서 반복 변환 시 파일 재파싱 생략
+        self._memory = {}
+
+    def _paths(self, url):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()[:12]
+        filename = f"{key}_{url.rstrip('/').rsplit('/', 1)[-1]}"
+        body_path = os.path.join(self.cache_dir, filename)
+        return body_path, body_path + ".meta.json"
+
+    def _load(self, url):
+        """(meta, data) 또는 (None, None). 캐시 파일이 깨졌으면 없는 것으로 취급"""
+        cached = self._memory.get(url)
+        if cached is not None:
+            return cached
+        body_path, meta_path = self._paths(url)
+        if not (os.path.exists(body_path) and os.path.exists(meta_path)):
+            return None, None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                data = json.loads(f.read())
+        except (OSError, ValueError) as e:
+            print(f"[게임 데이터] 캐시 파일 손상 (다시 다운로드): {e}")
+            return None, None
+        self._memory[url] = (meta, data)
+        return meta, data
+
+    def _save_meta(self, url, meta):
+        _, meta_path = self._paths(url)
+        try:
+            atomic_write(meta_path, json.dumps(meta, indent=2).encode('utf-8'))
+        except OSError as e:
+            print(f"[게임 데이터] 메타데이터 저장 실패: {e}")
+
+    def _store(self, url, headers, content, data):
+        body_path, _ = self._paths(url)
+        meta = {
+            "url": url,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "fetched": time.time(),
+        }
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # 본문을 먼저 쓰고 메타데이터를 씀 (메타데이터가 본문보다 새 버전을 가리키지 않도록)
+            atomic_write(body_path, content)
+            self._save_meta(url, meta)
+        except OSError as e:
+            print(f"[게임 데이터] 캐시 저장 실패 (이번 실행만 메모리에서 사용): {e}")
+        self._memory[url] = (meta, data)
+
+    @staticmethod
+    def _read(response, progress):
+        """
+        본문을 조각 단위로 읽으며 progress(받은 바이트, 전체 바이트 또는 0) 호출.
+        Content-Length는 전송(gzip 압축) 크기이므로, 받은 양도 압축 해제 전 바이트 수(raw.tell)로 셉니다.
+        """
+        total = int(response.headers.get("Content-Length") or 0)
+        tell = getattr(response.raw, "tell", None)
+        chunks = []
+        received = 0
+        for chunk in response.iter_content(GAME_DATA_CHUNK_SIZE):
+            chunks.append(chunk)
+            received += len(chunk)
+            if progress is not None:
+                progress(tell() if tell is not None else received, total)
+        return b"".join(chunks)
+
+    def get(self, url, name=None, log=print, progress=None):
+        """
+        url의 JSON을 반환합니다. (TTL 안이면 캐시, 지나면 조건부 요청으로 재확인)
+        log: 진행 메시지를 받을 함수 (GUI에서는 log_signal.emit)
+        progress: 다운로드 중 progress(받은 바이트, 전체 바이트 또는 0) 호출
+        """
+        name = name or url.rsplit('/', 1)[-1]
+        meta, data = self._load(url)
+        if meta is not None and (self.offline or time.time() - meta.get("fetched", 0) < self.ttl):
+            return data
+        if self.offline:
+            raise GameDataError(f"{name} 캐시가 없습니다 (오프라인 모드)")
+
+        headers = {}
+        if meta is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        log(f"📥 {name} 데이터 {'확인' if meta is not None else '다운로드'} 중...")
+        try:
+            with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+                if response.status_code == 304 and meta is not None:
+                    meta = dict(meta, fetched=time.time())
+                    self._save_meta(url, meta)
+                    self._memory[url] = (meta, data)
+                    return data
+                response.raise_for_status()
+                content = self._read(response, progress)
+            new_data = json.loads(content)
+        except (requests.RequestException, ValueError) as e:
+            if meta is not None:
+                log(f"⚠️ {name} 갱신 실패, 캐시 사용: {e}")
+                return data
+            raise GameDataError(f"{name} 다운로드 실패: {e}") from e
+
+        self._store(url, response.headers, content, new_data)
+        return new_data
+
+    def get_many(self, items, log=print, progress=None):
+        """
+        items: [(url, name), ...] 을 동시에 받아 같은 순서의 JSON 목록으로 반환합니다.
+        (전체 시간 = 가장 느린 DB 하나) 하나라도 실패하면 첫 GameDataError를 그대로 올립니다.
+        progress: 전체 진행률 progress(0.0~1.0). 호출은 잠금 안에서 순서대로 이루어집니다.
+        """
+        fractions = [0.0] * len(items)
+        lock = threading.Lock()
+
+        def report(index, fraction):
+            with lock:
+                fractions[index] = fraction
+                progress(sum(fractions) / len(fractions))
+
+        def fetch(index, url, name):
+            def on_progress(received, total):
+                # 크기를 모르는 응답(Content-Length 없음)은 완료 시점에만 반영
+                if total:
+                    report(index, min(received / total, 1.0))
+
+            data = self.get(url, name, log, on_progress if progress is not None else None)
+            if progress is not None:
+                report(index, 1.0)
+            return data
+
+        with ThreadPoolExecutor(max_workers=max(len(items), 1)) as executor:
+            futures = [executor.submit(fetch, i, url, name) for i, (url, name) in enumerate(items)]
+            return [future.result() for future in futures]
+
+    def clear(self):
+        """메모리/디스크 캐시 모두 삭제"""
+        self._memory.clear()
+        if not os.path.isdir(self.cache_dir):
+            return
+        for filename in os.listdir(self.cache_dir):
+            try:
+                os.remove(os.path.join(self.cache_dir, filename))
+            except OSError:
+                pass
+
+_default_cache = None
+
+def default_cache():
+    """config 설정을 쓰는 공용 캐시 (빌드 변환기/분석 스크립트가 공유)"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = GameDataCache()
+    return _default_cache
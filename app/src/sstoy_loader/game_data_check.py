@@ -0,0 +1,193 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+try:
+    from .game_data import GameDataCache, GameDataError, make_session
+except ImportError:
+    # 단독 실행
+    from game_data import GameDataCache, GameDataError, make_session
+
+# =========================================================
+# GameDataCache 동작 확인 (로컬 HTTP 대역 서버 사용, 외부 네트워크 불필요)
+#   python -m src.sstoy_loader.game_data_check
+# ETag/Last-Modified 조건부 재확인(304), TTL 만료, 오프라인 모드, 네트워크 오류 시 캐시 사용,
+# 캐시가 없을 때 GameDataError, 5xx 재시도를 확인하고 하나라도 실패하면 종료 코드 1
+# =========================================================
+
+class StandInServer:
+    """
+    SSToy 데이터 저장소 대역 서버.
+    files: 경로 -> JSON 객체. 본문이 바뀌면 ETag/Last-Modified도 바뀝니다.
+    fail_next: 경로 -> 앞으로 503으로 응답할 횟수 (재시도 확인용)
+    """
+    def __init__(self, files):
+        self.requests = []
+        self.fail_next = {}
+        self._files = {}
+        for path, data in files.items():
+            self.set_file(path, data)
+        self._server = None
+        self._port = 0
+
+    def set_file(self, path, data):
+        version = self._files.get(path, (None, None, 0))[2] + 1
+        body = json.dumps(data).encode('utf-8')
+        modified = time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(1700000000 + version))
+        self._files[path] = (body, (f'"v{version}"', modified), version)
+
+    def last_modified(self, path):
+        """path의 현재 Last-Modified 값"""
+        return self._files[path][1][1]
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self._port}{path}"
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append((self.path, self.headers.get("If-None-Match"),
+                                        self.headers.get("If-Modified-Since")))
+                if server.fail_next.get(self.path, 0) > 0:
+                    server.fail_next[self.path] -= 1
+                    self._reply(503)
+                    return
+                entry = server._files.get(self.path)
+                if entry is None:
+                    self._reply(404)
+                    return
+                body, (etag, modified), _ = entry
+                if self.headers.get("If-None-Match") == etag:
+                    self._reply(304)
+                    return
+                self._reply(200, body, {"ETag": etag, "Last-Modified": modified})
+
+            def _reply(self, status, body=b"", headers=None):
+                self.send_response(status)
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        # 같은 포트로 다시 띄울 수 있도록 (서버 중단 후 재시작 확인)
+        ThreadingHTTPServer.allow_reuse_address = True
+        self._server = ThreadingHTTPServer(("127.0.0.1", self._port), Handler)
+        self._port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+def run_checks():
+    """반환값: (확인 항목 이름, 통과 여부) 목록"""
+    results = []
+
+    def check(name, fn):
+        """fn(): 통과 여부. 예상하지 못한 예외도 실패로 기록하고 다음 항목 계속"""
+        try:
+            passed = bool(fn())
+        except Exception as e:
+            print(f"[게임 데이터 확인] {name}: {type(e).__name__}: {e}", file=sys.stderr)
+            passed = False
+        results.append((name, passed))
+
+    def expect_error(fn):
+        try:
+            fn()
+        except GameDataError:
+            return True
+        return False
+
+    quiet = lambda message: None
+    character = {"100": {"Name": "A"}}
+    server = StandInServer({"/Character.json": character, "/Potential.json": {"1": 1}, "/EN/Character.json": {"k": "v"}})
+    server.start()
+    cache_dir = tempfile.mkdtemp(prefix="sstoy_gamedata_")
+    url = server.url("/Character.json")
+    try:
+        def new_cache(**kwargs):
+            # 디스크 캐시는 공유하고 메모리 캐시는 새로 (프로그램 재실행과 같은 상태)
+            kwargs.setdefault("ttl", 60)
+            return GameDataCache(cache_dir=cache_dir, timeout=(1, 2),
+                                 session=make_session(retries=2, backoff=0), **kwargs)
+
+        # 1. 첫 요청: 다운로드 후 디스크 저장
+        check("첫 요청 다운로드", lambda: new_cache().get(url, log=quiet) == character and len(server.requests) == 1)
+        check("디스크 저장 (본문 + 메타데이터)", lambda: len(os.listdir(cache_dir)) == 2)
+
+        # 2. TTL 안: 요청 없음
+        count = len(server.requests)
+        check("TTL 안에서는 요청 없음",
+              lambda: new_cache().get(url, log=quiet) == character and len(server.requests) == count)
+
+        # 3. TTL 만료 + 변경 없음: 조건부 요청 -> 304 -> 캐시 사용
+        check("304 응답 시 캐시 사용", lambda: new_cache(ttl=0).get(url, log=quiet) == character)
+        check("TTL 만료 시 조건부 요청 (If-None-Match/If-Modified-Since)",
+              lambda: len(server.requests) == count + 1 and server.requests[-1][1:] == ('"v1"', server.last_modified("/Character.json")))
+
+        # 4. TTL 만료 + 서버 데이터 변경: 새 본문으로 교체
+        updated = {"100": {"Name": "A"}, "101": {"Name": "B"}}
+        server.set_file("/Character.json", updated)
+        check("변경된 데이터 다운로드", lambda: new_cache(ttl=0).get(url, log=quiet) == updated)
+        check("변경된 데이터 디스크 반영", lambda: new_cache().get(url, log=quiet) == updated)
+
+        # 5. 5xx 재시도
+        server.fail_next["/Potential.json"] = 2
+        count = len(server.requests)
+        check("503 두 번 후 재시도로 성공", lambda: new_cache().get(server.url("/Potential.json"), log=quiet) == {"1": 1}
+              and len(server.requests) == count + 3)
+
+        # 6. 여러 DB 동시 요청 (순서 유지)
+        urls = [(server.url(p), p) for p in ("/Character.json", "/Potential.json", "/EN/Character.json")]
+        check("get_many 순서 유지",
+              lambda: new_cache(ttl=0).get_many(urls, log=quiet) == [updated, {"1": 1}, {"k": "v"}])
+
+        # 7. 오프라인 모드: 요청 없이 캐시 사용 / 캐시 없으면 GameDataError
+        count = len(server.requests)
+        check("오프라인 모드 캐시 사용",
+              lambda: new_cache(offline=True, ttl=0).get(url, log=quiet) == updated and len(server.requests) == count)
+        check("오프라인 모드 캐시 없음 -> GameDataError",
+              lambda: expect_error(lambda: new_cache(offline=True).get(server.url("/Missing.json"), log=quiet)))
+
+        # 8. 네트워크 끊김: 만료된 캐시라도 사용 / 캐시 없으면 GameDataError
+        server.stop()
+        check("서버 중단 시 만료된 캐시 사용", lambda: new_cache(ttl=0).get(url, log=quiet) == updated)
+        check("서버 중단 + 캐시 없음 -> GameDataError",
+              lambda: expect_error(lambda: new_cache().get(server.url("/Missing.json"), log=quiet)))
+
+        # 9. 캐시 파일 손상: 다시 다운로드
+        server.start()
+        for filename in os.listdir(cache_dir):
+            if not filename.endswith(".meta.json") and filename.endswith("_Character.json"):
+                with open(os.path.join(cache_dir, filename), 'w', encoding='utf-8') as f:
+                    f.write("{broken")
+        check("손상된 캐시는 다시 다운로드", lambda: new_cache().get(url, log=quiet) == updated)
+    finally:
+        server.stop()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    return results
+
+def main():
+    results = run_checks()
+    for name, passed in results:
+        print(f"{'OK ' if passed else '실패'} {name}")
+    failed = sum(not passed for _, passed in results)
+    print(f"[게임 데이터 확인] {len(results) - failed}/{len(results)} 통과")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
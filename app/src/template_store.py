@@ -0,0 +1,196 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from config import (REFERENCE_WIDTH, SCALED_TEMPLATE_CACHE_SIZE, PYRAMID_SEARCH, PYRAMID_LEVELS,
+                    SKILL_TEMPLATE_MEMORY_MB, TEMPLATE_FULL_CHECK)
+from src.load_image import (prepare_cache_dir, list_shard_dirs, prune_shards, load_manifest, save_manifest,
+                            sync_shard, read_shard, faces_from_views, scale_skill_set, downsample_skill_set)
+
+class SkillTemplateStore:
+    """
+    캐릭터별 스킬 템플릿을 필요할 때만 백그라운드 스레드에서 로드합니다.
+    - 얼굴이 인식되거나 빌드에 포함된 캐릭터만 request()로 로드 (해상도별 스케일/축소본 포함)
+    - 상주 캐릭터는 LRU로 관리하고, 메모리 합이 상한을 넘으면 오래 쓰지 않은 캐릭터부터 해제
+    - 준비되지 않은 캐릭터는 get() 결과에서 빠지므로 스캔 스레드는 로딩을 기다리지 않음
+    """
+    def __init__(self, base_folder, max_bytes=SKILL_TEMPLATE_MEMORY_MB * 1024 * 1024,
+                 coarse_levels=PYRAMID_LEVELS if PYRAMID_SEARCH else 0, full_check=TEMPLATE_FULL_CHECK):
+        self.base_folder = base_folder
+        self.full_check = full_check  # True면 폴더 mtime이 같아도 파일별 size/mtime 확인
+        self.max_bytes = max_bytes
+        self.coarse_levels = coarse_levels
+
+        self._resident = OrderedDict()  # char -> {"raw", "scaled": {(w, h): skills}, "coarse", "bytes"}
+        self._pending = set()           # 로드 중인 (char, (w, h))
+        self._version = 0               # 상주 템플릿이 바뀔 때마다 증가 (get 스냅샷 재사용 판단)
+        self._snapshot = None           # (key, version, skills, coarse)
+        self._lock = threading.Lock()
+        self._manifest_lock = threading.Lock()
+        self._listeners = []
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="TemplateLoader")
+
+        self.cache_dir = None
+        self.manifest = None
+        self.shard_dirs = {}
+        self._manifest_dirty = False
+        if os.path.exists(base_folder):
+            self.cache_dir = prepare_cache_dir(base_folder)
+            self.manifest = load_manifest(base_folder)
+            self.shard_dirs = list_shard_dirs(base_folder)
+            self._manifest_dirty = bool(prune_shards(self.manifest, self.shard_dirs, self.cache_dir))
+
+    @staticmethod
+    def _key(geo):
+        return (geo["w"], geo["h"]) if geo else None
+
+    def add_listener(self, callback):
+        """캐릭터 로드 완료 알림 콜백 등록 (로더 스레드에서 호출됨)"""
+        self._listeners.append(callback)
+
+    def has_character(self, char_name):
+        """스킬 템플릿 폴더가 있는 캐릭터인지 (로드 여부와 무관)"""
+        return f"potentials/{char_name}" in self.shard_dirs
+
+    def characters(self):
+        """스킬 템플릿 폴더가 있는 캐릭터 목록"""
+        return [key.split("/", 1)[1] for key in self.shard_dirs if key != "icons"]
+
+    def _read(self, key):
+        """샤드를 (필요하면 재생성 후) 메모리 매핑으로 읽기"""
+        with self._manifest_lock:
+            entry, status = sync_shard(self.manifest, self.shard_dirs[key], self.cache_dir, key,
+                                       self.full_check)
+            if status != "fresh" or self._manifest_dirty:
+                try:
+                    save_manifest(self.base_folder, self.manifest)
+                    self._manifest_dirty = False
+                except Exception as e:
+                    print(f"[오류] 캐시 저장 실패: {e}")
+            if status == "rebuilt":
+                print(f">>> [시스템] 변경된 템플릿 샤드 재생성: {key}")
+        return read_shard(self.cache_dir, entry)
+
+    def load_faces(self):
+        """얼굴 템플릿은 매 틱 전체를 비교하므로 시작 시 바로 로드. 반환값: {char_name: (img, mask)}"""
+        if "icons" not in self.shard_dirs:
+            return {}
+        try:
+            return faces_from_views(self._read("icons"))
+        except Exception as e:
+            print(f"[오류] 템플릿 샤드 처리 실패 (icons): {e}")
+            return {}
+
+    def request(self, char_names, geo=None):
+        """
+        캐릭터 스킬 템플릿 로드를 예약합니다. (스레드 안전, 즉시 반환)
+        이미 geo 해상도로 준비된 캐릭터는 LRU 순서만 갱신합니다.
+        """
+        key = self._key(geo)
+        with self._lock:
+            for char_name in char_names:
+                if not self.has_character(char_name):
+                    continue
+                entry = self._resident.get(char_name)
+                if entry is not None:
+                    self._resident.move_to_end(char_name)
+                    if key is None or key in entry["scaled"]:
+                        continue
+                if (char_name, key) in self._pending:
+                    continue
+                self._pending.add((char_name, key))
+                self._executor.submit(self._load, char_name, key)
+
+    def wait(self):
+        """지금까지 예약된 로드가 모두 끝날 때까지 대기 (로더는 단일 스레드라 순서대로 처리됨)"""
+        self._executor.submit(lambda: None).result()
+
+    def preload(self, char_names, geo=None):
+        """로드 예약 후 완료까지 대기 (리플레이/배치 처리처럼 결정적인 결과가 필요할 때)"""
+        self.request(char_names, geo)
+        self.wait()
+
+    def _load(self, char_name, key):
+        """로더 스레드: 샤드 읽기 -> 해상도 스케일 -> 축소본 생성 -> LRU 등록"""
+        try:
+            with self._lock:
+                entry = self._resident.get(char_name)
+            raw = entry["raw"] if entry else self._read(f"potentials/{char_name}")
+
+            scaled = coarse = None
+            if key is not None:
+                scaled = scale_skill_set(raw, key[0] / REFERENCE_WIDTH)
+                if self.coarse_levels:
+                    coarse = downsample_skill_set(scaled, self.coarse_levels)
+
+            with self._lock:
+                entry = self._resident.setdefault(char_name, {"raw": raw, "scaled": OrderedDict(), "coarse": {}})
+                self._resident.move_to_end(char_name)
+                if scaled is not None:
+                    entry["scaled"][key] = scaled
+                    entry["coarse"][key] = coarse
+                    while len(entry["scaled"]) > SCALED_TEMPLATE_CACHE_SIZE:
+                        old_key, _ = entry["scaled"].popitem(last=False)
+                        entry["coarse"].pop(old_key, None)
+                entry["bytes"] = self._entry_bytes(entry)
+                self._evict(keep=char_name)
+                self._version += 1
+        except Exception as e:
+            print(f"[오류] 스킬 템플릿 로드 실패 ({char_name}): {e}")
+        finally:
+            with self._lock:
+                self._pending.discard((char_name, key))
+
+        for callback in self._listeners:
+            callback()
+
+    @staticmethod
+    def _entry_bytes(entry):
+        total = sum(img.nbytes for img in entry["raw"].values())
+        for key, skills in entry["scaled"].items():
+            if skills is not entry["raw"]:
+                total += sum(img.nbytes for img in skills.values())
+            coarse = entry["coarse"].get(key)
+            if coarse:
+                total += sum(img.nbytes for img in coarse.values())
+        return total
+
+    def _evict(self, keep):
+        """메모리 상한을 넘으면 오래 쓰지 않은 캐릭터부터 해제 (방금 로드한 캐릭터는 유지)"""
+        total = sum(entry["bytes"] for entry in self._resident.values())
+        for char_name in list(self._resident):
+            if total <= self.max_bytes:
+                break
+            if char_name == keep:
+                continue
+            total -= self._resident.pop(char_name)["bytes"]
+            print(f"[템플릿] 메모리 상한 초과: '{char_name}' 스킬 템플릿 해제")
+
+    def get(self, geo):
+        """
+        geo 해상도로 준비된 캐릭터만 담은 스냅샷 반환.
+        상주 템플릿이 그대로면 직전 스냅샷을 재사용합니다. (매 틱 dict를 새로 만들지 않도록)
+        반환값: (skill_templates {char: {filename: img}}, coarse_skills {char: {filename: img}})
+        """
+        key = self._key(geo)
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot[0] == key and snapshot[1] == self._version:
+                return snapshot[2], snapshot[3]
+            skills = {}
+            coarse = {}
+            for char_name, entry in self._resident.items():
+                if key in entry["scaled"]:
+                    skills[char_name] = entry["scaled"][key]
+                    if entry["coarse"].get(key) is not None:
+                        coarse[char_name] = entry["coarse"][key]
+            self._snapshot = (key, self._version, skills, coarse)
+        return skills, coarse
+
+    def resident_bytes(self):
+        with self._lock:
+            return sum(entry["bytes"] for entry in self._resident.values())
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
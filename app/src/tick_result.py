@@ -0,0 +1,109 @@
+import threading
+from collections import namedtuple
+
+from src.capture import geometry_key
+
+# 점수는 오버레이 표시 자릿수로 반올림해서 비교 (미세한 점수 흔들림으로 매 틱 다시 그리지 않도록)
+SCORE_DECIMALS = 2
+
+# ROI 하나의 표시 상태
+# face:  (캐릭터 이름 또는 "No Face", 점수) 또는 None
+# skill: (디버그 텍스트, 점수) 또는 None
+# match: (filename, score, matched, priority) 또는 None
+RoiState = namedtuple("RoiState", ["face", "skill", "match"])
+EMPTY_ROI = RoiState(None, None, None)
+
+def _rounded(pair):
+    return (pair[0], round(float(pair[1]), SCORE_DECIMALS)) if pair is not None else None
+
+class TickResult:
+    """
+    워커 -> 오버레이/컨트롤 패널로 틱마다 한 번 보내는 결과 스냅샷 (읽기 전용으로 취급).
+    changed: 직전 전송 대비 바뀐 ROI 인덱스 집합
+    """
+    __slots__ = ("geo", "status", "status_text", "rois", "changed", "geo_changed", "status_changed")
+
+    def __init__(self, geo, status, status_text, rois, changed, geo_changed, status_changed):
+        self.geo = geo
+        self.status = status
+        self.status_text = status_text
+        self.rois = rois
+        self.changed = changed
+        self.geo_changed = geo_changed
+        self.status_changed = status_changed
+
+class TickResultBuilder:
+    """
+    틱 동안 ROI 인식 결과/게임 창 위치/상태를 모아 두었다가,
+    직전 전송과 달라진 것이 있을 때만 TickResult 하나로 묶어 돌려줍니다.
+    (상태 변경은 GUI 스레드에서도 호출되므로 잠금 사용)
+    """
+    def __init__(self, roi_count):
+        self._lock = threading.Lock()
+        self.geo = None
+        self.status = None
+        self.status_text = ""
+        self.rois = [EMPTY_ROI] * roi_count
+        self._changed = set()
+        self._geo_changed = False
+        self._status_changed = False
+
+    def set_geometry(self, geo):
+        """
+        창 위치/크기(x, y, w, h)가 바뀌었을 때만 geo_changed 표시.
+        포커스만 바뀐 경우(alt-tab)는 geo 값만 갱신하고 오버레이 레이아웃은 다시 계산하지 않습니다.
+        """
+        with self._lock:
+            moved = (geometry_key(geo) if geo else None) != (geometry_key(self.geo) if self.geo else None)
+            self.geo = dict(geo) if geo else None
+            if moved:
+                self._geo_changed = True
+
+    def set_status(self, status, text):
+        with self._lock:
+            if (status, text) != (self.status, self.status_text):
+                self.status, self.status_text = status, text
+                self._status_changed = True
+
+    def clear(self):
+        """모든 ROI 표시 초기화 (일시정지/게임 창 없음)"""
+        with self._lock:
+            for i, state in enumerate(self.rois):
+                if state != EMPTY_ROI:
+                    self.rois[i] = EMPTY_ROI
+                    self._changed.add(i)
+
+    def update_roi(self, index, result):
+        """
+        RoiRecognizer.recognize_roi 결과 반영.
+        스킬 탐색을 하지 않은 경우(얼굴 미인식/템플릿 로드 대기) 직전 매칭 결과는 유지합니다.
+        """
+        match = result["match"]
+        with self._lock:
+            old = self.rois[index]
+            if match is not None:
+                filename, score, matched, priority = match
+                match = (filename, round(float(score), SCORE_DECIMALS), matched, priority)
+            else:
+                match = old.match
+            face = result["face_debug"]
+            if face is not None and face[0].startswith("[FACE]"):
+                face = (face[0][len("[FACE]"):], face[1])
+            state = RoiState(_rounded(face), _rounded(result["skill_debug"]), match)
+            if state != old:
+                self.rois[index] = state
+                self._changed.add(index)
+
+    def take(self):
+        """바뀐 것이 있으면 TickResult, 없으면 None (호출 후 변경 표시 초기화)"""
+        with self._lock:
+            if not (self._changed or self._geo_changed or self._status_changed):
+                return None
+            result = TickResult(
+                dict(self.geo) if self.geo else None, self.status, self.status_text,
+                tuple(self.rois), frozenset(self._changed), self._geo_changed, self._status_changed
+            )
+            self._changed = set()
+            self._geo_changed = False
+            self._status_changed = False
+            return result
@@ -0,0 +1,105 @@
+import cv2
+import numpy as np
+
+from config import (FACE_MATCH_THRESHOLD, SKILL_MATCH_THRESHOLD,
+                    TRACK_FACE_DIFF_MARGIN, TRACK_SKILL_SCORE_MARGIN, TRACK_SKILL_RIVAL_MARGIN, TRACK_WINDOW_RATIO)
+from src.matcher import crop_search_window
+from src.buffer_pool import match_template
+
+class RoiTrack:
+    """
+    ROI 하나의 직전 인식 결과(얼굴/스킬 템플릿과 매칭 위치)를 보관합니다.
+    다음 틱에서는 직전 위치 주변에서만 재확인하고,
+    점수가 히스테리시스 범위를 벗어날 때만 전체 탐색으로 돌아갑니다.
+    같은 캐릭터의 다른 잠재력은 직전 템플릿으로도 거의 같은 점수가 나오므로,
+    스킬 재확인은 캐릭터의 스킬 템플릿 전체를 작은 창에서 다시 점수화해 직전 템플릿이 여전히 1등인지 봅니다.
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.char_name = None
+        self.face_loc = None
+        self.face_diff = None
+        self.clear_skill()
+
+    def clear_skill(self):
+        self.skill_file = None
+        self.skill_loc = None
+        self.skill_score = None
+
+    def set_face(self, char_name, diff, loc):
+        if char_name != self.char_name:
+            self.clear_skill()
+        self.char_name = char_name
+        self.face_loc = loc
+        # 기준 점수는 처음 확정될 때의 값으로 유지 (재확인 때마다 기준이 밀리지 않도록)
+        if self.face_diff is None or diff < self.face_diff:
+            self.face_diff = diff
+
+    def set_skill(self, filename, score, loc):
+        if filename != self.skill_file:
+            self.skill_score = None
+        self.skill_file = filename
+        self.skill_loc = loc
+        if self.skill_score is None or score > self.skill_score:
+            self.skill_score = score
+
+    def face_keep_limit(self):
+        """재확인 시 허용할 최대 얼굴 차이값 (확정 당시 값 + 여유, 최대 인식 기준)"""
+        return min(FACE_MATCH_THRESHOLD, self.face_diff + TRACK_FACE_DIFF_MARGIN)
+
+    def skill_keep_limit(self):
+        """재확인 시 요구할 최소 스킬 점수 (확정 당시 값 - 여유, 최소 인식 기준)"""
+        return max(SKILL_MATCH_THRESHOLD, self.skill_score - TRACK_SKILL_SCORE_MARGIN)
+
+    def keeps_skill(self, score, rival_score):
+        """재확인 결과로 직전 스킬을 유지할지 (점수 기준 + 다른 잠재력보다 확실히 높을 때만)"""
+        return score >= self.skill_keep_limit() and score - rival_score >= TRACK_SKILL_RIVAL_MARGIN
+
+def verify_face(gray, track, face_img, face_mask, buffers=None):
+    """직전 얼굴 템플릿만 재확인. 반환값: (diff, loc) 또는 None"""
+    window, (x0, y0) = crop_search_window(gray, track.face_loc, face_img.shape, TRACK_WINDOW_RATIO)
+    if window.shape[0] < face_img.shape[0] or window.shape[1] < face_img.shape[1]:
+        return None
+
+    res = match_template(window, face_img, cv2.TM_SQDIFF_NORMED, face_mask, buffers, "verify_face")
+    min_val, _, min_loc, _ = cv2.minMaxLoc(res)
+    return min_val, (x0 + min_loc[0], y0 + min_loc[1])
+
+def verify_skill(gray, track, templates, buffers=None):
+    """
+    직전 스킬 템플릿을 재확인하고, 찾은 위치 한 점에서 같은 캐릭터의 나머지 템플릿 점수도 구합니다.
+    (잠재력 아이콘은 카드 안 같은 자리에 있으므로 다른 잠재력으로 바뀌었으면 그 자리에서 더 높게 나옴)
+    templates: 캐릭터의 {filename: img}
+    반환값: (직전 템플릿 점수, loc, 나머지 템플릿 중 최고 점수) 또는 None
+    """
+    skill_img = templates[track.skill_file]
+    window, (x0, y0) = crop_search_window(gray, track.skill_loc, skill_img.shape, TRACK_WINDOW_RATIO)
+    if window.shape[0] < skill_img.shape[0] or window.shape[1] < skill_img.shape[1]:
+        return None
+
+    res = match_template(window, skill_img, cv2.TM_CCOEFF_NORMED, None, buffers, "verify_skill")
+    _, max_val, _, max_loc = cv2.minMaxLoc(res)
+    x, y = x0 + max_loc[0], y0 + max_loc[1]
+
+    rival = 0.0
+    for filename, img in templates.items():
+        h, w = img.shape[:2]
+        if filename == track.skill_file or y + h > gray.shape[0] or x + w > gray.shape[1]:
+            continue
+        rival = max(rival, _ccoeff_at(gray[y:y + h, x:x + w], img))
+    return max_val, (x, y), rival
+
+def _ccoeff_at(patch, img):
+    """
+    같은 크기 두 영상의 TM_CCOEFF_NORMED 점수 한 점
+    (matchTemplate은 1x1 결과에도 DFT 경로를 타서 느리므로 평균/표준편차와 내적으로 직접 계산)
+    """
+    (patch_mean,), (patch_std,) = cv2.meanStdDev(patch)
+    (img_mean,), (img_std,) = cv2.meanStdDev(img)
+    denom = patch_std[0] * img_std[0]
+    if denom < 1e-6:
+        return 0.0
+    dot = np.einsum('ij,ij->', patch, img, dtype=np.int64, casting='unsafe')
+    return float((dot / patch.size - patch_mean[0] * img_mean[0]) / denom)
@@ -0,0 +1,187 @@
+import ctypes
+import threading
+import time
+from ctypes import wintypes
+
+from config import WINDOW_HEARTBEAT
+from src.load_resolution import find_game_window, get_window_geometry
+
+class GeometryProvider:
+    """
+    게임 창 위치 조회 인터페이스.
+    구현체는 query()로 현재 geo를 돌려주고, 창이 움직이거나 크기가 바뀌면 mark_dirty()를 호출합니다.
+    """
+    def __init__(self):
+        self._dirty = True
+        self._listeners = []
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def query(self):
+        """현재 게임 창 geo {x, y, w, h, focused} 또는 None"""
+        raise NotImplementedError
+
+    def add_listener(self, callback):
+        """변경 알림 콜백 등록 (provider 스레드에서 호출될 수 있음)"""
+        self._listeners.append(callback)
+
+    def mark_dirty(self):
+        self._dirty = True
+        for callback in self._listeners:
+            callback()
+
+    def consume_dirty(self):
+        dirty = self._dirty
+        self._dirty = False
+        return dirty
+
+class FakeGeometryProvider(GeometryProvider):
+    """프로세스 내부용 가짜 구현 (Linux/헤드리스 테스트 및 벤치마크용)"""
+    def __init__(self, geo=None):
+        super().__init__()
+        self._geo = dict(geo) if geo else None
+
+    def set_geometry(self, geo):
+        self._geo = dict(geo) if geo else None
+        self.mark_dirty()
+
+    def query(self):
+        return dict(self._geo) if self._geo else None
+
+# =========================================================
+# Win32 구현 (WinEvent 훅 기반)
+# =========================================================
+EVENT_SYSTEM_FOREGROUND = 0x0003
+EVENT_SYSTEM_MINIMIZESTART = 0x0016
+EVENT_SYSTEM_MINIMIZEEND = 0x0017
+EVENT_OBJECT_DESTROY = 0x8001
+EVENT_OBJECT_LOCATIONCHANGE = 0x800B
+WINEVENT_OUTOFCONTEXT = 0x0000
+WINEVENT_SKIPOWNPROCESS = 0x0002
+OBJID_WINDOW = 0
+WM_QUIT = 0x0012
+WM_APP_REHOOK = 0x8000 + 1
+
+WINEVENTPROC = getattr(ctypes, "WINFUNCTYPE", ctypes.CFUNCTYPE)(
+    None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+    wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD
+)
+
+class Win32GeometryProvider(GeometryProvider):
+    """
+    게임 창 핸들을 캐싱하고, WinEvent 훅으로 이동/크기 변경/최소화/포커스 변경을 감지합니다.
+    창 열거(find_game_window)는 핸들이 없거나 무효해졌을 때만 수행합니다.
+    """
+    def __init__(self):
+        super().__init__()
+        self.hwnd = None
+        self._thread = None
+        self._thread_id = None
+        self._ready = threading.Event()
+        # 콜백 객체가 GC되지 않도록 참조 유지
+        self._proc = WINEVENTPROC(self._on_event)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._hook_loop, name="WindowTracker", daemon=True)
+        self._thread.start()
+        self._ready.wait(1.0)
+
+    def stop(self):
+        if self._thread_id:
+            ctypes.windll.user32.PostThreadMessageW(self._thread_id, WM_QUIT, 0, 0)
+        self._thread = None
+
+    def _set_hook(self, event_min, event_max, pid):
+        return ctypes.windll.user32.SetWinEventHook(
+            event_min, event_max, None, self._proc, pid, 0,
+            WINEVENT_OUTOFCONTEXT | WINEVENT_SKIPOWNPROCESS
+        )
+
+    def _hook_loop(self):
+        """훅 전용 스레드: WinEvent 훅은 메시지 루프가 있는 스레드에서만 동작"""
+        user32 = ctypes.windll.user32
+        user32.SetWinEventHook.restype = wintypes.HANDLE
+        self._thread_id = ctypes.windll.kernel32.GetCurrentThreadId()
+
+        hooks = [self._set_hook(EVENT_SYSTEM_FOREGROUND, EVENT_SYSTEM_FOREGROUND, 0)]
+        window_hooks = []
+        self._ready.set()
+
+        msg = wintypes.MSG()
+        while user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+            if msg.message == WM_APP_REHOOK:
+                # 게임 프로세스 한정 훅을 새 핸들 기준으로 다시 설치
+                for hook in window_hooks:
+                    user32.UnhookWinEvent(hook)
+                window_hooks = []
+                pid = msg.wParam
+                if pid:
+                    window_hooks = [
+                        self._set_hook(EVENT_SYSTEM_MINIMIZESTART, EVENT_SYSTEM_MINIMIZEEND, pid),
+                        self._set_hook(EVENT_OBJECT_DESTROY, EVENT_OBJECT_LOCATIONCHANGE, pid),
+                    ]
+                continue
+            user32.TranslateMessage(ctypes.byref(msg))
+            user32.DispatchMessageW(ctypes.byref(msg))
+
+        for hook in hooks + window_hooks:
+            user32.UnhookWinEvent(hook)
+        self._thread_id = None
+
+    def _on_event(self, hook, event, hwnd, id_object, id_child, thread, event_time):
+        if event == EVENT_SYSTEM_FOREGROUND:
+            self.mark_dirty()
+        elif hwnd == self.hwnd and id_object == OBJID_WINDOW:
+            if event == EVENT_OBJECT_DESTROY:
+                self.hwnd = None
+            self.mark_dirty()
+
+    def _ensure_hwnd(self):
+        user32 = ctypes.windll.user32
+        if self.hwnd and user32.IsWindow(self.hwnd):
+            return self.hwnd
+
+        self.hwnd = find_game_window()
+        if self._thread_id:
+            pid = wintypes.DWORD(0)
+            if self.hwnd:
+                user32.GetWindowThreadProcessId(self.hwnd, ctypes.byref(pid))
+            user32.PostThreadMessageW(self._thread_id, WM_APP_REHOOK, pid.value, 0)
+        return self.hwnd
+
+    def query(self):
+        try:
+            hwnd = self._ensure_hwnd()
+            if not hwnd: return None
+            return get_window_geometry(hwnd)
+        except:
+            self.hwnd = None
+            return None
+
+class WindowTracker:
+    """
+    GeometryProvider 결과를 캐싱합니다.
+    변경 알림(dirty)이 있거나 하트비트 주기가 지났을 때만 실제로 재조회합니다.
+    """
+    def __init__(self, provider, heartbeat=WINDOW_HEARTBEAT):
+        self.provider = provider
+        self.heartbeat = heartbeat
+        self.geo = None
+        self._last_query = 0.0
+
+    def poll(self):
+        """반환값: (geo, changed) - changed는 직전 geo와 달라졌을 때만 True"""
+        now = time.monotonic()
+        if self.provider.consume_dirty() or now - self._last_query >= self.heartbeat:
+            self._last_query = now
+            geo = self.provider.query()
+            changed = geo != self.geo
+            self.geo = geo
+            return geo, changed
+        return self.geo, False
@@ -1,167 +1,290 @@
+import os
 import time
 import cv2
 import mss
-import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 import ctypes
 from ctypes import wintypes
 from PyQt5.QtCore import QThread, pyqtSignal
 
 # 모듈 임포트
-from src.load_image import load_templates
+from src.load_image import ScaledTemplateCache
+from src.template_store import SkillTemplateStore
 from src.load_build import BuildLoader
-from config import TEMPLATE_FOLDER, ROIS, FACE_OFFSET, REFERENCE_WIDTH, AppStatus
-from src.load_resolution import get_game_geometry, get_capture_area
+from config import (TEMPLATE_FOLDER, ROIS, PYRAMID_SEARCH, FACE_INDEX, ANCHOR_MODE,
+                    SCAN_WORKERS, OPENCV_THREADS, SESSION_RECORD, SESSIONS_DIR,
+                    PROFILE_EMIT_INTERVAL, AppStatus)
+from src.window_tracker import WindowTracker, Win32GeometryProvider
+from src.capture import get_capture_plan
+from src.matcher import FaceIndex
+from src.anchor import AnchorStore
+from src.change_detector import RoiChangeDetector
+from src.recognizer import RoiRecognizer
+from src.scheduler import ScanScheduler
+from src.tick_result import TickResultBuilder
+from src.replay import SessionRecorder
+from src.profiler import StageProfiler
 
 class MatcherWorker(QThread):
-    # 기존 시그널들
-    match_signal = pyqtSignal(int, str, float, bool, int)
-    reset_signal = pyqtSignal()
-    status_signal = pyqtSignal(AppStatus, str)
-    debug_signal = pyqtSignal(int, str, float)
+    # 틱 결과 (TickResult: ROI별 인식 결과 + 게임 창 위치 + 상태) - 바뀐 것이 있을 때만 틱당 한 번
+    result_signal = pyqtSignal(object)
     initial_load_finished = pyqtSignal()
-    
-    # [★핵심 수정] 이 줄이 없어서 에러가 난 것입니다. 꼭 포함되어야 합니다!
-    geometry_signal = pyqtSignal(dict)
 
-    def __init__(self, build_file):
+    # 단계별 소요 시간 통계 (StageProfiler.snapshot, PROFILE_EMIT_INTERVAL마다)
+    stats_signal = pyqtSignal(dict)
+
+    def __init__(self, build_file, geometry_provider=None):
         super().__init__()
         self.build_file = build_file
-        self.build_loader = None
+        # 게임 창 위치 조회 방식 (기본: Win32 창 추적, 테스트/벤치마크: FakeGeometryProvider)
+        self.geometry_provider = geometry_provider or Win32GeometryProvider()
         self.running = True
         self.paused = True
+        self.capture_plan = None
+        self.change_detectors = [RoiChangeDetector() for _ in ROIS]
+        self.scheduler = ScanScheduler()
+        self.executor = None
+        self.recorder = None
+        self.profiler = StageProfiler()
+        # 얼굴/스킬 인식 로직 (템플릿 저장소, 빌드 후보, 추적 상태, 앵커 포함)
+        self.recognizer = RoiRecognizer(self.profiler, anchor_store=AnchorStore() if ANCHOR_MODE else None)
+        self.results_invalidated = False
+        self.results = TickResultBuilder(len(ROIS))
 
     def update_build(self, new_build_file):
         self.build_file = new_build_file
-        self.build_loader = BuildLoader(self.build_file)
-        self.status_signal.emit(AppStatus.IDLE, f"빌드 변경됨: {new_build_file}")
+        self.recognizer.set_build(BuildLoader(self.build_file))
+        self.request_build_templates()
+        self.invalidate_results()
+        self.set_status(AppStatus.IDLE, f"빌드 변경됨: {new_build_file}")
+
+    def request_build_templates(self, geo=None):
+        """빌드에 포함된 캐릭터의 스킬 템플릿을 미리 백그라운드 로드"""
+        recognizer = self.recognizer
+        if recognizer.template_store is None or recognizer.build_loader is None:
+            return
+        recognizer.template_store.request(recognizer.build_loader.target_map.keys(), geo or recognizer.current_geo)
+
+    def invalidate_results(self):
+        """다음 틱에서 모든 ROI를 변화 여부와 관계없이 다시 인식하도록 요청"""
+        self.results_invalidated = True
+
+    def publish(self):
+        """모아 둔 결과 중 바뀐 것이 있으면 result_signal 한 번으로 전송"""
+        result = self.results.take()
+        if result is not None:
+            self.result_signal.emit(result)
+
+    def set_status(self, status, text):
+        """틱 루프 밖에서의 상태 변경 (즉시 전송)"""
+        self.results.set_status(status, text)
+        self.publish()
 
     def set_paused(self, paused):
         self.paused = paused
         if self.paused:
-            self.status_signal.emit(AppStatus.PAUSED, "일시정지됨")
-            self.reset_signal.emit()
+            self.results.clear()
+            self.set_status(AppStatus.PAUSED, "일시정지됨")
+            self.invalidate_results()
         else:
-            self.status_signal.emit(AppStatus.RUNNING, "실행중")
+            self.set_status(AppStatus.RUNNING, "실행중")
+            self.scheduler.notify()
 
     def run(self):
         """메인 실행 루프"""
-        self.status_signal.emit(AppStatus.LOADING, "리소스 로딩 중...")
-        self.build_loader = BuildLoader(self.build_file)
-        
-        face_templates, skill_templates = load_templates(TEMPLATE_FOLDER)
-        if not face_templates:
-            self.status_signal.emit(AppStatus.ERROR, "오류: 템플릿 로드 실패")
+        self.set_status(AppStatus.LOADING, "리소스 로딩 중...")
+        template_cache = self.load_resources()
+        if template_cache is None:
+            self.set_status(AppStatus.ERROR, "오류: 템플릿 로드 실패")
             return
         
-        self.status_signal.emit(AppStatus.RUNNING, "실행중")
+        self.set_status(AppStatus.RUNNING, "실행중")
         self.initial_load_finished.emit()
 
+        # ROI 병렬 인식용 스레드 풀 (SCAN_WORKERS <= 1이면 순차 처리)
+        self.configure_threads()
+
+        # 창 이동/크기 변경/포커스 변경 시 대기 중인 스캔을 즉시 깨움
+        window_tracker = WindowTracker(self.geometry_provider)
+        self.geometry_provider.add_listener(self.scheduler.notify)
+        self.geometry_provider.start()
+
+        if SESSION_RECORD:
+            self.start_recording()
+
+        last_stats_emit = 0.0
+
         with mss.mss() as sct:
             while self.running:
                 if self.paused:
-                    time.sleep(0.5)
+                    # 재개/종료 시 notify로 즉시 깨어남 (폴링 없음)
+                    self.scheduler.sleep()
                     continue
 
-                # 1. 게임 창 위치 찾기
-                geo = get_game_geometry()
+                self.scheduler.begin_tick()
+                tick_start = time.perf_counter()
+
+                # 1. 게임 창 위치 찾기 (캐시된 핸들, 변경 시에만 재조회)
+                geo, geo_changed = window_tracker.poll()
                 
                 if not geo:
-                    self.status_signal.emit(AppStatus.IDLE, "게임 찾는 중...")
-                    self.reset_signal.emit()
-                    time.sleep(1)
+                    self.results.clear()
+                    self.set_status(AppStatus.IDLE, "게임 찾는 중...")
+                    self.invalidate_results()
+                    self.scheduler.wait_idle("not_found")
                     continue
 
-                # [★핵심 수정] 찾은 좌표를 오버레이로 전송
-                self.geometry_signal.emit(geo) 
-                self.status_signal.emit(AppStatus.RUNNING, "실행중")
+                # 찾은 좌표는 틱 결과에 담아 전송 (바뀌었을 때만)
+                if geo_changed:
+                    self.results.set_geometry(geo)
+                    # 새 해상도용 빌드 캐릭터 스킬 템플릿을 미리 준비
+                    self.request_build_templates(geo)
+                self.results.set_status(AppStatus.RUNNING, "실행중")
 
-                # 2. 화면 스캔 및 인식 처리
-                self.process_rois(sct, geo, face_templates, skill_templates)
+                # 2. 화면 스캔 및 인식 처리 (결과는 틱당 한 번, 바뀐 것이 있을 때만 전송)
+                self.scan_tick(sct, geo, template_cache)
+                self.publish()
+                self.profiler.add("tick", time.perf_counter() - tick_start)
+                self.profiler.mark_tick()
+                if tick_start - last_stats_emit >= PROFILE_EMIT_INTERVAL:
+                    last_stats_emit = tick_start
+                    self.stats_signal.emit(self.profiler.snapshot())
 
-                time.sleep(0.1)
+                # 3. 다음 스캔까지 대기 (비활성 창이면 백오프)
+                if geo.get("focused", True):
+                    self.scheduler.wait_active()
+                else:
+                    self.scheduler.wait_idle("unfocused")
 
-    def process_rois(self, sct, geo, face_templates, skill_templates):
-        """모든 ROI(감시 영역)를 순회하며 인식 수행"""
-        scale_factor = REFERENCE_WIDTH / geo["w"]
+        self.stop_recording()
+        self.geometry_provider.stop()
+        self.recognizer.template_store.shutdown()
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
 
-        for i, roi in enumerate(ROIS):
-            # 1단계: 얼굴 인식 시도
-            detected_char, diff = self.detect_face(sct, geo, roi, face_templates, scale_factor)
-            
-            self.debug_signal.emit(i, f"[FACE]{detected_char}" if detected_char else "No Face", 1.0 - diff)
+    def load_resources(self):
+        """
+        빌드와 템플릿을 로드합니다. (라이브 루프/리플레이 공용)
+        반환값: 얼굴 템플릿 ScaledTemplateCache, 실패 시 None
+        """
+        recognizer = self.recognizer
+        recognizer.set_build(BuildLoader(self.build_file))
+        
+        # 얼굴 템플릿만 바로 로드하고, 스킬 템플릿은 캐릭터별로 필요할 때 백그라운드 로드
+        recognizer.template_store = SkillTemplateStore(TEMPLATE_FOLDER)
+        recognizer.template_store.add_listener(self.scheduler.notify)
+        face_templates = recognizer.template_store.load_faces()
+        if not face_templates:
+            return None
+        self.request_build_templates()
 
-            if detected_char and diff <= 0.15:
-                # 얼굴을 찾았으면 -> 2단계: 스킬 인식 시도
-                if detected_char not in skill_templates:
-                    self.match_signal.emit(i, f"{detected_char}", 1.0 - diff, True, 0)
-                    continue
+        # 얼굴 후보를 행렬곱 한 번으로 추리는 사전 필터 (로드 시 한 번 생성)
+        if FACE_INDEX:
+            recognizer.face_index = FaceIndex(face_templates)
 
-                self.detect_skill(sct, geo, roi, detected_char, skill_templates, scale_factor, i)
-            else:
-                self.match_signal.emit(i, "", 0.0, False, 0)
+        # 게임 해상도별로 미리 스케일한 얼굴 템플릿 세트 (프레임 리사이즈 제거)
+        return ScaledTemplateCache(face_templates, {})
 
-    def detect_face(self, sct, geo, roi, face_templates, scale_factor):
-        """얼굴 인식 로직"""
-        face_area = get_capture_area(geo, roi, FACE_OFFSET)
-        if face_area["left"] < 0 or face_area["top"] < 0:
-            return None, 1.0
+    def scan_tick(self, sct, geo, template_cache):
+        """틱 하나의 화면 스캔 및 인식 처리 (sct: mss 또는 리플레이 프레임 소스)"""
+        lookup_start = time.perf_counter()
+        face_templates, _ = template_cache.get(geo)
+        skill_templates, coarse_skills = self.recognizer.template_store.get(geo)
+        if PYRAMID_SEARCH:
+            # 사전 필터를 쓰면 얼굴은 상위 후보만 원본 해상도에서 바로 판정 (축소 탐색 불필요)
+            coarse_faces = template_cache.get_coarse(geo)[0] if self.recognizer.face_index is None else None
+            coarse_templates = (coarse_faces, coarse_skills)
+        else:
+            coarse_templates = None
+        self.profiler.add("templates", time.perf_counter() - lookup_start)
+        self.process_rois(sct, geo, face_templates, skill_templates, coarse_templates)
 
-        try:
-            frame = np.array(sct.grab(face_area))
-        except:
-            return None, 1.0
+    def start_recording(self, path=None):
+        """캡처 프레임 녹화 시작 (path 생략 시 sessions/<시각> 폴더)"""
+        self.stop_recording()
+        path = path or os.path.join(SESSIONS_DIR, time.strftime("%Y%m%d_%H%M%S"))
+        self.recorder = SessionRecorder(path)
+        print(f"[녹화] 세션 녹화 시작: {path}")
 
-        if scale_factor != 1.0:
-            frame = cv2.resize(frame, None, fx=scale_factor, fy=scale_factor, interpolation=cv2.INTER_AREA)
+    def stop_recording(self):
+        recorder, self.recorder = self.recorder, None
+        if recorder is not None:
+            recorder.close()
+            print(f"[녹화] 세션 녹화 종료: {recorder.frame_count}프레임")
 
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGRA2GRAY)
-        
-        detected_char = None
-        best_diff = 1.0
-        
-        for char_name, (face_img, face_mask) in face_templates.items():
-            res = cv2.matchTemplate(gray, face_img, cv2.TM_SQDIFF_NORMED, mask=face_mask)
-            min_val, _, _, _ = cv2.minMaxLoc(res)
-            
-            if min_val < best_diff:
-                best_diff = min_val
-                detected_char = char_name
-                
-        return detected_char, best_diff
-
-    def detect_skill(self, sct, geo, roi, char_name, skill_templates, scale_factor, index):
-        """스킬 아이콘 인식 로직"""
-        card_area = get_capture_area(geo, roi, None)
-        try:
-            frame = np.array(sct.grab(card_area))
-        except:
-            return
+    def configure_threads(self):
+        """
+        ROI 스레드 풀 크기와 OpenCV 내부 스레드 수를 함께 설정합니다.
+        두 값을 곱한 스레드 수가 CPU 코어 수를 넘지 않도록 맞춰 과다 구독을 방지합니다.
+        """
+        workers = min(SCAN_WORKERS, len(ROIS))
+        if workers > 1:
+            self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="RoiMatcher")
 
-        if scale_factor != 1.0:
-            frame = cv2.resize(frame, None, fx=scale_factor, fy=scale_factor, interpolation=cv2.INTER_AREA)
+        if OPENCV_THREADS > 0:
+            cv2.setNumThreads(OPENCV_THREADS)
+        elif workers > 1:
+            cv2.setNumThreads(max(1, (os.cpu_count() or 1) // workers))
 
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGRA2GRAY)
+    def process_rois(self, sct, geo, face_templates, skill_templates, coarse_templates=None):
+        """
+        모든 ROI(감시 영역)를 순회하며 인식 수행 (템플릿은 geo 해상도로 스케일된 상태)
+        coarse_templates: (coarse_faces, coarse_skills) - 주어지면 coarse-to-fine 탐색 사용
+        """
+        # 틱당 한 번만 캡처하고, 각 영역은 슬라이스 뷰로 사용
+        plan = get_capture_plan(self.capture_plan, geo)
+        if plan is not self.capture_plan or self.results_invalidated:
+            self.results_invalidated = False
+            for detector in self.change_detectors:
+                detector.reset()
+            self.recognizer.reset_tracks()
+        if plan is not self.capture_plan:
+            self.recognizer.clear_buffers()
+        self.capture_plan = plan
+        self.recognizer.current_geo = geo
 
-        best_score = 0
-        best_filename = ""
+        grab_start = time.perf_counter()
+        frame = self.capture_plan.grab(sct)
+        self.profiler.add("grab", time.perf_counter() - grab_start)
+        if self.recorder is not None and frame is not None:
+            self.recorder.record(geo, frame)
 
-        for filename, skill_img in skill_templates[char_name].items():
-            res = cv2.matchTemplate(gray, skill_img, cv2.TM_CCOEFF_NORMED)
-            _, max_val, _, _ = cv2.minMaxLoc(res)
-            
-            if max_val > best_score:
-                best_score = max_val
-                best_filename = filename
+        # 0단계: 화면이 바뀐 ROI만 인식 대상으로 선정 (나머지는 이전 결과/오버레이 유지)
+        jobs = []
+        for i in range(len(ROIS)):
+            face_frame = self.capture_plan.face_view(frame, i)
+            card_frame = self.capture_plan.card_view(frame, i)
+            detector = self.change_detectors[i]
+            if detector.update(face_frame, card_frame):
+                jobs.append((i, face_frame, card_frame))
 
-        self.debug_signal.emit(index, best_filename, best_score)
-
-        if best_score >= 0.75:
-            priority = self.build_loader.get_priority(char_name, best_filename)
-            self.match_signal.emit(index, best_filename, best_score, True, priority)
+        # ROI별 인식은 서로 독립적이므로 스레드 풀에서 병렬 수행 가능
+        if self.executor is not None and len(jobs) > 1:
+            futures = [
+                self.executor.submit(self.recognizer.recognize_roi, i, face_frame, card_frame,
+                                     face_templates, skill_templates, coarse_templates)
+                for i, face_frame, card_frame in jobs
+            ]
+            results = [future.result() for future in futures]
         else:
-            self.match_signal.emit(index, f"{char_name} (?)", 0.0, True, 0)
+            results = [
+                self.recognizer.recognize_roi(i, face_frame, card_frame, face_templates, skill_templates, coarse_templates)
+                for i, face_frame, card_frame in jobs
+            ]
+
+        # 결과는 ROI 순서대로 틱 결과에 모아 두고, 전송은 틱 끝에 한 번 (publish)
+        emit_start = time.perf_counter()
+        for (i, _, _), result in zip(jobs, results):
+            self.results.update_roi(i, result)
+            if result["pending"]:
+                # 스킬 템플릿 로드가 끝나면 화면 변화가 없어도 다시 인식
+                self.change_detectors[i].request_recheck()
+        if jobs:
+            self.profiler.add("emit", time.perf_counter() - emit_start)
 
     def stop(self):
         self.running = False
+        self.scheduler.notify()
         self.quit()
         self.wait()
\ No newline at end of file